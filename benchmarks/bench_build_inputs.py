@@ -0,0 +1,108 @@
+"""Rows/sec of the columnar CreateEntityInput builder against the old loop.
+
+    python benchmarks/bench_build_inputs.py --rows 10000 1000000
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+from godel.schema import CreateEntityInput, StatementInputRecordInput
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "streamlit"))
+
+from ingest import build_create_entity_inputs  # noqa: E402
+
+PREDICATES = {
+    "Is a": {"id": "is-a", "objectType": "ENTITY"},
+    "Website": {"id": "website", "objectType": "ANY_URI"},
+    "Industry": {"id": "industry", "objectType": "STRING"},
+    "Founded": {"id": "founded", "objectType": "DATE"},
+}
+TRIPLE_COL_MAP = {"website": "Website", "industries": "Industry", "founded": "Founded"}
+
+
+def make_frame(n, seed=0):
+    rng = np.random.default_rng(seed)
+    industries = np.array(["Fintech", "Fintech, Payments", "AI, Robotics, Hardware"])
+    df = pd.DataFrame(
+        {
+            "name": [f"Company {i}" for i in range(n)],
+            "website": [f"https://company{i}.com" for i in range(n)],
+            "industries": industries[rng.integers(0, len(industries), n)],
+            "founded": "2001-01-01",
+        }
+    )
+    # Sprinkle in missing values
+    df.loc[rng.random(n) < 0.1, "founded"] = None
+    return df
+
+
+def legacy_build(ingest_df, subject_col, triple_col_map, predicates, template_id):
+    # The per-cell loop previously inlined in Structured_Data.py
+    create_entity_inputs = []
+    for i in range(len(ingest_df)):
+        name = ingest_df[subject_col][i]
+        statement_input_record_inputs = [
+            StatementInputRecordInput(
+                predicate_id=predicates["Is a"]["id"],
+                object_value=template_id,
+                citation_urls=[],
+                qualifiers=[],
+            )
+        ]
+        for pred_col, pred_name in triple_col_map.items():
+            object_value = ingest_df[pred_col][i]
+            if ", " in object_value:
+                object_values = object_value.split(", ")
+            else:
+                object_values = [object_value]
+            for object_value in object_values:
+                statement_input_record_inputs.append(
+                    StatementInputRecordInput(
+                        predicate_id=predicates[pred_name]["id"],
+                        object_value=object_value,
+                        citation_urls=[],
+                        qualifiers=[],
+                    )
+                )
+        create_entity_inputs.append(
+            CreateEntityInput(name=name, statements=statement_input_record_inputs)
+        )
+    return create_entity_inputs
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, nargs="+", default=[10000, 1000000])
+    parser.add_argument(
+        "--legacy-max-rows",
+        type=int,
+        default=1000000,
+        help="skip the legacy loop above this many rows",
+    )
+    args = parser.parse_args()
+
+    for n in args.rows:
+        df = make_frame(n)
+        args_ = (df, "name", TRIPLE_COL_MAP, PREDICATES, "template")
+        columnar = timed(build_create_entity_inputs, *args_)
+        line = f"{n:>9} rows  columnar {n / columnar:>10.0f} rows/s"
+        if n <= args.legacy_max_rows:
+            # The old loop crashed on missing values, so give it empty strings
+            legacy_args = (df.fillna(""),) + args_[1:]
+            legacy = timed(legacy_build, *legacy_args)
+            line += f"  loop {n / legacy:>10.0f} rows/s  speedup {legacy / columnar:.1f}x"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""Per-page parse cost of metadata and text extraction, before and after.
+
+    python benchmarks/bench_extraction.py --repeat 20
+    python benchmarks/bench_extraction.py path/to/pages/*.html
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+
+import extruct
+from w3lib.html import get_base_url
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "streamlit"))
+
+from helper import boil_html, extract_metadata  # noqa: E402
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures", "pages", "*.html")
+URL = "https://example.com/"
+
+
+def before(html_doc):
+    # What meta_from_website did before: every syntax, through extruct.extract
+    extruct.extract(html_doc, base_url=get_base_url(html_doc, URL))
+
+
+def after_default(html_doc):
+    extract_metadata(html_doc, URL)
+
+
+def after_og_jsonld(html_doc):
+    extract_metadata(html_doc, URL, syntaxes=("opengraph", "json-ld"))
+
+
+def boilerplate(html_doc):
+    boil_html(html_doc)
+
+
+def per_page_ms(fn, pages, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for page in pages:
+            fn(page)
+    return (time.perf_counter() - start) * 1000 / (repeat * len(pages))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("pages", nargs="*", help="HTML files, defaults to fixtures")
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    paths = args.pages or sorted(glob.glob(FIXTURES))
+    pages = []
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            pages.append(f.read())
+
+    print(f"{len(pages)} pages x {args.repeat}")
+    for name, fn in [
+        ("before: extruct.extract, all syntaxes", before),
+        ("after: single parse, default syntaxes", after_default),
+        ("after: single parse, opengraph + json-ld", after_og_jsonld),
+        ("boilerplate text (boilerpy3)", boilerplate),
+    ]:
+        print(f"{name:<45} {per_page_ms(fn, pages, args.repeat):8.2f} ms/page")
+
+
+if __name__ == "__main__":
+    main()
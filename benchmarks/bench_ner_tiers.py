@@ -0,0 +1,83 @@
+"""Throughput and accuracy of the Text to Triples NER tiers.
+
+Accuracy is precision/recall/F1 over exact (start, end, label) matches
+against an annotated JSONL sample, one {"text", "entities": [[start, end,
+label], ...]} object per line.
+
+    python benchmarks/bench_ner_tiers.py --repeat 20
+    python benchmarks/bench_ner_tiers.py --labels ORG PERSON GPE sample.jsonl
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "streamlit"))
+
+from models import TIERS, get_tier_nlp  # noqa: E402
+
+FIXTURE = os.path.join(os.path.dirname(__file__), "fixtures", "ner_sample.jsonl")
+
+
+def read_sample(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def scores(nlp, sample, labels):
+    tp = fp = fn = 0
+    for doc, record in zip(nlp.pipe(r["text"] for r in sample), sample):
+        predicted = {
+            (e.start_char, e.end_char, e.label_) for e in doc.ents if e.label_ in labels
+        }
+        gold = {tuple(e) for e in record["entities"] if e[2] in labels}
+        tp += len(predicted & gold)
+        fp += len(predicted - gold)
+        fn += len(gold - predicted)
+    precision = tp / (tp + fp) if tp + fp else 0.0
+    recall = tp / (tp + fn) if tp + fn else 0.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    return precision, recall, f1
+
+
+def docs_per_second(nlp, texts, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for _ in nlp.pipe(texts):
+            pass
+    return repeat * len(texts) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("sample", nargs="?", default=FIXTURE)
+    parser.add_argument("--tiers", nargs="+", choices=list(TIERS), default=list(TIERS))
+    parser.add_argument("--labels", nargs="+", default=["ORG", "PERSON"])
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    sample = read_sample(args.sample)
+    texts = [r["text"] for r in sample]
+    labels = set(args.labels)
+
+    print(f"{len(sample)} docs x {args.repeat}, labels {' '.join(sorted(labels))}")
+    print(f"{'tier':<8} {'load s':>8} {'docs/s':>10} {'P':>6} {'R':>6} {'F1':>6}")
+    for tier in args.tiers:
+        start = time.perf_counter()
+        try:
+            nlp = get_tier_nlp(tier)
+        except OSError as e:
+            print(f"{tier:<8} not installed ({e})")
+            continue
+        load = time.perf_counter() - start
+        rate = docs_per_second(nlp, texts, args.repeat)
+        precision, recall, f1 = scores(nlp, sample, labels)
+        print(
+            f"{tier:<8} {load:8.2f} {rate:10.1f} "
+            f"{precision:6.2f} {recall:6.2f} {f1:6.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Micro-benchmark of helper.iter_scan against the old recursive_scan.
+
+    python benchmarks/bench_scan.py --nodes 10000
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "streamlit"))
+
+from helper import iter_scan  # noqa: E402
+
+MAX_RECURSION_DEPTH = 10
+
+
+def legacy_recursive_scan(
+    o, target_keys=["content", "og:description"], skip_keys=["microformat"], depth=1
+):
+    # The recursive implementation previously in helper.py
+    if depth >= MAX_RECURSION_DEPTH:
+        return []
+    results = []
+    if isinstance(o, dict):
+        for k in o.keys():
+            if k in skip_keys:
+                continue
+            if k in target_keys:
+                results.append(o[k])
+            results.extend(legacy_recursive_scan(o[k], depth=depth + 1))
+    if isinstance(o, list):
+        for item in o:
+            results.extend(legacy_recursive_scan(item, depth=depth + 1))
+    return results
+
+
+def make_graph(nodes):
+    # extruct style output with a large JSON-LD @graph
+    graph = []
+    for i in range(nodes):
+        graph.append(
+            {
+                "@type": "Organization",
+                "@id": f"https://example.com/#org{i}",
+                "name": f"Organization {i}",
+                "description": {"content": f"Description of organization {i}"},
+                "address": {
+                    "@type": "PostalAddress",
+                    "addressLocality": "Pittsburgh",
+                    "geo": {"latitude": 40.44, "longitude": -79.99},
+                },
+                "member": [
+                    {"@type": "Person", "name": f"Person {i}-{j}"} for j in range(3)
+                ],
+            }
+        )
+    return {
+        "json-ld": [{"@context": "https://schema.org", "@graph": graph}],
+        "opengraph": [{"properties": [["og:description", "A page"]]}],
+        "dublincore": [{"elements": [{"name": "title", "content": "A page"}]}],
+        "microformat": [{"content": "skipped"}],
+    }
+
+
+def timed(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn()
+    return (time.perf_counter() - start) / repeat, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--nodes", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    meta = make_graph(args.nodes)
+    legacy, legacy_result = timed(lambda: legacy_recursive_scan(meta), args.repeat)
+    iterative, result = timed(lambda: list(iter_scan(meta)), args.repeat)
+    first, _ = timed(lambda: next(iter_scan(meta), None), args.repeat)
+    assert result == legacy_result
+
+    print(f"{args.nodes} JSON-LD nodes, {len(result)} matches")
+    print(f"recursive_scan (old)   {legacy * 1000:8.2f} ms")
+    print(f"iter_scan, all matches {iterative * 1000:8.2f} ms")
+    print(f"iter_scan, first match {first * 1000:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,8 @@
+import json
 from io import StringIO
 
 import pandas as pd
 import streamlit as st
-from godel import GoldenAPI
-from godel.schema import (
-    CreateEntityInput,
-    QualifierInputRecordInput,
-    StatementInputRecordInput,
-)
 from st_aggrid import (
     AgGrid,
     DataReturnMode,
@@ -17,8 +12,40 @@ from st_aggrid import (
 )
 from st_aggrid.shared import AgGridTheme
 
+from api import golden_api
+from dedupe import EXACT, exact_match_keys, find_existing
+from grid import DEFAULT_PAGE_SIZE, apply_deltas, cell_deltas, page_count, page_slice
+from ingest import (
+    DEFAULT_CHUNKSIZE,
+    TABLE_FORMATS,
+    build_create_entity_inputs,
+    mapping_config,
+    read_chunks,
+    read_table,
+    sample_chunks,
+    stream_create_entity_inputs,
+    table_columns,
+)
+from journal import SubmissionJournal, input_key, journal_path
+from schema import get_schema
+from search import normalize_query
+from submit import (
+    DEFAULT_BATCH_SIZE,
+    DEFAULT_CONCURRENCY,
+    DEFAULT_RATE,
+    SubmissionEngine,
+    created_entity,
+    result_errors,
+    submit_create_entities,
+)
+from suggest import get_predicate_index, ranked_names
+from validate import error_messages, highlight_errors, validate
+
 st.set_page_config(layout="wide")
 
+# Cap on created/failed rows kept for display so streamed imports stay bounded
+MAX_REPORTED_ROWS = 1000
+
 st.markdown("# Data Table Import")
 st.sidebar.markdown("# Data Table Import")
 
@@ -27,67 +54,133 @@ st.sidebar.markdown("# Data Table Import")
 api_key = st.text_input("API Key", "")
 
 # API
-if api_key:
-    goldapi = GoldenAPI(jwt_token=api_key)
-else:
-    goldapi = GoldenAPI()
+goldapi = golden_api(api_key)
 
 "# 1. Upload your data"
 "This currently works best for single row -> single subject entity ingest"
 
-uploaded_file = st.file_uploader("Upload CSVs and data tables here.")
+uploaded_file = st.file_uploader(
+    "Upload CSVs and data tables here.",
+    type=[extension.lstrip(".") for extension in TABLE_FORMATS],
+    help="CSV, Parquet, Arrow IPC/Feather or Excel (.xlsx)",
+)
+
+streaming = st.checkbox(
+    "Streaming import",
+    help="Read the file in chunks and preview a random sample. Use for large files.",
+)
+chunksize = st.number_input(
+    "Rows per chunk", 1000, 1000000, DEFAULT_CHUNKSIZE, 1000, disabled=not streaming
+)
 
 df = pd.DataFrame([])
+total_rows = 0
 
 if uploaded_file:
-    # Can be used wherever a "file-like" object is accepted:
     try:
-        dataframe = pd.read_csv(uploaded_file)
-    except:
-        pass
-
-    gb = GridOptionsBuilder.from_dataframe(dataframe)
-    gb.configure_pagination(paginationAutoPageSize=True)  # Add pagination
+        # Only the chosen columns are read, wide tables don't have to be
+        # loaded whole to map a few of their columns
+        all_columns = table_columns(uploaded_file)
+        load_columns = st.multiselect("Columns to load", all_columns, all_columns)
+        # Keep the file's column order
+        load_columns = [col for col in all_columns if col in load_columns]
+        if not load_columns:
+            st.warning("Pick at least one column to load")
+            st.stop()
+        # One backing frame and one preview per upload, whatever is loaded
+        upload_key = f"{uploaded_file.name}:{uploaded_file.size}"
+        table_key = f"table:{upload_key}"
+        preview_key = f"preview:{upload_key}"
+        stale_keys = [
+            key
+            for key in st.session_state
+            if isinstance(key, str)
+            and key.startswith(("table:", "preview:"))
+            and key not in (table_key, preview_key)
+        ]
+        for key in stale_keys:
+            del st.session_state[key]
+
+        if streaming:
+            # Sampling scans the whole file, so only redo it when the
+            # loaded columns change
+            preview = st.session_state.get(preview_key)
+            if preview is None or preview[2] != load_columns:
+                sample, sampled_rows = sample_chunks(
+                    read_chunks(uploaded_file, int(chunksize), columns=load_columns)
+                )
+                preview = (sample, sampled_rows, load_columns)
+                st.session_state[preview_key] = preview
+            dataframe, total_rows, _ = preview
+        else:
+            # The backing frame lives in the session, grid edits are applied
+            # to it in place instead of re-reading the upload on every rerun.
+            # Added columns are read in, removed ones are projected away, and
+            # edits to the columns that stay are kept.
+            frame = st.session_state.get(table_key)
+            if frame is None:
+                frame = read_table(uploaded_file, columns=load_columns)
+            else:
+                added = [col for col in load_columns if col not in frame.columns]
+                if added:
+                    added_df = read_table(uploaded_file, columns=added)
+                    for col in added:
+                        frame[col] = added_df[col].to_numpy()
+                if list(frame.columns) != load_columns:
+                    frame = frame.reindex(columns=load_columns)
+            st.session_state[table_key] = frame
+            dataframe = frame
+            total_rows = len(dataframe)
+    except Exception as e:
+        st.error(f"Could not read {uploaded_file.name}: {e}")
+        st.stop()
+
+    if streaming:
+        f"Previewing {len(dataframe)} randomly sampled rows of {total_rows}"
+
+    # Only the current page is sent to the grid
+    col1, col2 = st.columns(2)
+    page_size = col1.number_input("Rows per page", 10, 1000, DEFAULT_PAGE_SIZE, 10)
+    page = col2.number_input("Page", 1, page_count(len(dataframe), int(page_size)), 1)
+    page_df = page_slice(dataframe, int(page) - 1, int(page_size))
+
+    gb = GridOptionsBuilder.from_dataframe(page_df)
     gb.configure_side_bar()  # Add a sidebar
-    gb.configure_default_column(editable=True)
+    # Edits can't be applied to rows that are streamed from the file
+    gb.configure_default_column(editable=not streaming)
     gridOptions = gb.build()
 
     grid_response = AgGrid(
-        dataframe,
+        page_df,
         gridOptions=gridOptions,
         data_return_mode="AS_INPUT",
-        update_mode="MODEL_CHANGED",
+        update_mode=GridUpdateMode.VALUE_CHANGED,
         fit_columns_on_grid_load=False,
         theme=AgGridTheme.STREAMLIT,
         enable_enterprise_modules=True,
         height=350,
         width="100%",
         reload_data=True,
+        key=f"grid:{uploaded_file.name}:{page}:{page_size}",
     )
 
-    data = grid_response["data"]
-    df = pd.DataFrame(data)
-    df = df[:10]
+    if not streaming:
+        edited_cells = apply_deltas(
+            dataframe, cell_deltas(page_df, grid_response["data"])
+        )
+        if edited_cells:
+            f"Applied {edited_cells} edited cells"
+    df = dataframe
 
 
 "# 2. Specify Triples"
 
-# Get predicates and templates
-predicates = {}
-for p in goldapi.predicates()["data"]["predicates"]["edges"]:
-    p = p["node"]
-    predicates[p["name"]] = {"id": p["id"], "objectType": p["objectType"]}
-predicates_df = pd.DataFrame(predicates).transpose()
-
-templates = {}
-for t in goldapi.templates()["data"]["templates"]["edges"]:
-    t = t["node"]
-    templates[t["entity"]["name"]] = {
-        "id": t["id"],
-        "entityId": t["entityId"],
-        "entityDescription": t["entity"]["description"],
-    }
-templates_df = pd.DataFrame(templates).transpose()
+# Shared predicate and template data, refreshed in the background
+schema = get_schema()
+predicates = schema.predicates
+predicates_df = schema.predicates_df
+templates = schema.templates
+templates_df = schema.templates_df
 
 "### a. Pick a subject column and specify its template"
 # Iterate through columns and assign one of [None, "Subject", "Predicate"]
@@ -101,15 +194,29 @@ subject_template = st.selectbox(
 
 "### b. Specify a predicate field for each column"
 "None will specify a column's variables a null and do nothing"
+suggest_predicates = st.checkbox(
+    "Suggest predicates from column names",
+    True,
+    help="Predicates whose names are closest to the column name are listed first",
+)
+predicate_index = None
+if suggest_predicates:
+    try:
+        predicate_index = get_predicate_index(schema)
+    except OSError as e:
+        st.warning(f"Predicate suggestions are unavailable: {e}")
+
+plist = schema.predicate_names
 triple_col_map = {}
 for i, col in enumerate(columns):
     # skip subject col
     if col == subject_col:
         continue
 
-    plist = list(predicates_df.index)
     if col in predicates_df.index:
         pred_list = [col] + plist
+    elif predicate_index is not None:
+        pred_list = [None] + ranked_names(plist, predicate_index.suggest(col))
     else:
         pred_list = [None] + plist
 
@@ -124,6 +231,14 @@ triple_col_map = {k: v for k, v in triple_col_map.items() if v is not None}
 "Triple to predicate mapping"
 triple_col_map
 
+# The same mapping drives headless imports with import_cli.py
+st.download_button(
+    "Download mapping for import_cli.py",
+    json.dumps(mapping_config(subject_col, subject_template, triple_col_map), indent=2),
+    "mapping.json",
+    "application/json",
+)
+
 selected_columns = [subject_col] + list(triple_col_map.keys())
 
 if len(df):
@@ -131,69 +246,206 @@ if len(df):
 else:
     ingest_df = df
 
-# ingest_df
-# subject_col
-# subject_template
+template_entity_id = (
+    templates[subject_template]["entityId"] if subject_template else None
+)
 
-create_entity_inputs = []
+# Values that don't fit their predicate's object type would only fail at the
+# API, so their rows are caught here before anything is sent
+skip_invalid = st.checkbox("Skip rows with invalid values", value=True)
+invalid_counts = {"rows": 0}
 
-for i in range(len(ingest_df)):
-    name = ingest_df[subject_col][i]
 
-    # Add template
-    statement_input_record_inputs = []
+def valid_rows(chunk):
+    valid = ~validate(chunk, subject_col, triple_col_map, predicates).any(axis=1)
+    invalid_counts["rows"] += int((~valid).sum())
+    return valid.to_numpy()
 
-    statement_input_record_inputs.append(
-        StatementInputRecordInput(
-            predicate_id=predicates["Is a"]["id"],
-            object_value=templates["Company"]["entityId"],
-            citation_urls=[],
-            qualifiers=[],
+
+invalid_rows = None
+if len(ingest_df):
+    error_mask = validate(ingest_df, subject_col, triple_col_map, predicates)
+    invalid_rows = error_mask.any(axis=1)
+    if invalid_rows.any():
+        checked = "sampled rows" if streaming else "rows"
+        f"{int(invalid_rows.sum())} of {len(ingest_df)} {checked} have invalid values"
+        invalid_df = ingest_df[invalid_rows].head(MAX_REPORTED_ROWS).copy()
+        invalid_df.insert(
+            0, "errors", error_messages(error_mask, triple_col_map, predicates)
         )
+        st.dataframe(highlight_errors(invalid_df, error_mask))
+
+if not streaming:
+    valid = None
+    if skip_invalid and invalid_rows is not None:
+        valid = (~invalid_rows).to_numpy()
+        invalid_counts["rows"] = int(invalid_rows.sum())
+    input_rows, create_entity_inputs = build_create_entity_inputs(
+        ingest_df,
+        subject_col,
+        triple_col_map,
+        predicates,
+        template_entity_id,
+        valid=valid,
     )
 
-    # Add predicates
-    for pred_col, pred_name in triple_col_map.items():
-        object_value = ingest_df[pred_col][i]
-        # delimiter
-        if ", " in object_value:
-            object_values = object_value.split(", ")
+batch_mode = st.checkbox("Batch submissions", value=True)
+batch_size = st.number_input(
+    "Entities per request", 1, 500, DEFAULT_BATCH_SIZE, disabled=not batch_mode
+)
+concurrency = st.number_input("Concurrent requests", 1, 32, DEFAULT_CONCURRENCY)
+rate = st.number_input("Requests per second", 1, 100, DEFAULT_RATE)
+
+# Subject names that already exist would only create duplicates, so they
+# can be checked in bulk before anything is submitted
+existing_keys = set()
+if uploaded_file:
+    duplicates_key = (
+        f"duplicates:{uploaded_file.name}:{uploaded_file.size}:{subject_col}"
+    )
+    if st.button("Check subject names against existing entities"):
+        if streaming:
+            chunks = read_chunks(uploaded_file, int(chunksize), columns=[subject_col])
+            # Consumed lazily, only distinct names are kept
+            names = (name for chunk in chunks for name in chunk[subject_col].dropna())
         else:
-            object_values = [object_value]
-        for object_value in object_values:
-            statement_input_record_inputs.append(
-                StatementInputRecordInput(
-                    predicate_id=predicates[pred_name]["id"],
-                    object_value=object_value,
-                    citation_urls=[],
-                    qualifiers=[],
-                )
-            )
-    # Create Entity Input
-    create_entity_input = CreateEntityInput(
-        name=name, statements=statement_input_record_inputs
+            names = ingest_df[subject_col].dropna()
+        check_progress = st.progress(0)
+        st.session_state[duplicates_key] = find_existing(
+            goldapi,
+            names,
+            engine=SubmissionEngine(
+                api_key, concurrency=int(concurrency), rate=int(rate)
+            ),
+            on_progress=lambda done, total: check_progress.progress(
+                done / max(total, 1)
+            ),
+        )
+        check_progress.progress(1.0)
+
+    duplicates_report = st.session_state.get(duplicates_key)
+    if duplicates_report is not None:
+        report_df = pd.DataFrame(duplicates_report)
+        matched = report_df[report_df["match"].notna()] if len(report_df) else report_df
+        exact_count = int((report_df["match"] == EXACT).sum()) if len(report_df) else 0
+        (
+            f"{len(report_df)} distinct subject names, {exact_count} exact and "
+            f"{len(matched) - exact_count} probable or failed matches"
+        )
+        matched
+        if st.checkbox("Skip rows whose subject exactly matches an entity", True):
+            existing_keys = exact_match_keys(duplicates_report)
+
+# Created entities are journaled as they come back, so an interrupted import
+# can be resumed without creating them again
+journal_name = st.text_input(
+    "Import journal", uploaded_file.name if uploaded_file else "import"
+)
+resume = st.checkbox(
+    "Resume: skip rows already created in this journal",
+    value=True,
+    help=f"The journal is kept at {journal_path(journal_name)}",
+)
+
+created_entities = []
+failed_rows = []
+counts = {"created": 0, "skipped": 0, "existing": 0}
+
+
+def submit(engine, create_entity_inputs, on_progress, on_result):
+    if batch_mode:
+        return submit_create_entities(
+            goldapi,
+            engine,
+            create_entity_inputs,
+            batch_size=int(batch_size),
+            on_progress=on_progress,
+            on_result=on_result,
+        )
+    return engine.map(
+        lambda create_entity_input: engine.call(
+            goldapi.create_entity, input=create_entity_input.__to_json_value__()
+        ),
+        create_entity_inputs,
+        on_progress=on_progress,
+        on_result=on_result,
     )
-    create_entity_inputs.append(create_entity_input)
 
-created_data = []
 
-if st.button("Submit Entities and Triples"):
+def record_result(journal, key, row, result):
+    # Only a bounded number of results is kept for display
+    entity = created_entity(result)
+    if entity:
+        journal.record(key, entity)
+        counts["created"] += 1
+        if len(created_entities) < MAX_REPORTED_ROWS:
+            created_entities.append(entity)
+    elif len(failed_rows) < MAX_REPORTED_ROWS:
+        failed_rows.append({"row": row, "errors": result_errors(result)})
+
+
+# Streaming reads the rows from the upload at submit time
+if st.button(
+    "Submit Entities and Triples", disabled=streaming and uploaded_file is None
+):
     progress_bar = st.progress(0)
-    len_entity_inputs = len(create_entity_inputs)
-    for i, create_entity_input in enumerate(create_entity_inputs):
-        try:
-            progress_bar.progress((i + 1) / len_entity_inputs)
-        except:
-            print(i)
-            print(len_entity_inputs)
-        data = goldapi.create_entity(input=create_entity_input.__to_json_value__())
-        created_data.append(data)
+    engine = SubmissionEngine(api_key, concurrency=int(concurrency), rate=int(rate))
+
+    if streaming:
+        chunks = read_chunks(uploaded_file, int(chunksize), columns=selected_columns)
+        submissions = stream_create_entity_inputs(
+            chunks,
+            subject_col,
+            triple_col_map,
+            predicates,
+            template_entity_id,
+            row_filter=valid_rows if skip_invalid else None,
+        )
+    else:
+        submissions = [(0, input_rows, create_entity_inputs)]
+
+    with SubmissionJournal(journal_path(journal_name)) as journal:
+        for start_row, chunk_rows, chunk_inputs in submissions:
+            keys = [input_key(entity_input) for entity_input in chunk_inputs]
+            pending = [
+                i for i, key in enumerate(keys) if not (resume and key in journal)
+            ]
+            counts["skipped"] += len(chunk_inputs) - len(pending)
+            if existing_keys:
+                unjournaled = len(pending)
+                pending = [
+                    i
+                    for i in pending
+                    if normalize_query(chunk_inputs[i].name) not in existing_keys
+                ]
+                counts["existing"] += unjournaled - len(pending)
+            skipped = len(chunk_inputs) - len(pending)
+            submit(
+                engine,
+                [chunk_inputs[i] for i in pending],
+                lambda done, total: progress_bar.progress(
+                    min(1.0, (start_row + skipped + done) / max(total_rows, 1))
+                ),
+                lambda j, result: record_result(
+                    journal, keys[pending[j]], chunk_rows[pending[j]], result
+                ),
+            )
+    progress_bar.progress(1.0)
+    (
+        f"Created {counts['created']} entities, "
+        f"skipped {counts['skipped']} already in the journal "
+        f"and {counts['existing']} matching existing entities, "
+        f"{invalid_counts['rows']} invalid rows left out, "
+        f"retried requests: {engine.retries}"
+    )
 else:
     pass
 
 ### Submitted entities
 
-created_data_df = pd.DataFrame(
-    [d["data"]["createEntity"]["entity"] for d in created_data]
-)
+created_data_df = pd.DataFrame(created_entities)
 created_data_df
+
+if failed_rows:
+    "Failed rows"
+    pd.DataFrame(failed_rows)
@@ -0,0 +1,16 @@
+import os
+
+from godel import GoldenAPI
+
+# Set GOLDEN_API_URL to point every app at another GraphQL endpoint,
+# e.g. a staging deployment or a local stand-in server for load tests.
+GOLDEN_API_URL = os.environ.get("GOLDEN_API_URL", "")
+
+
+def golden_api(jwt_token=""):
+    kwargs = {}
+    if GOLDEN_API_URL:
+        kwargs["url"] = GOLDEN_API_URL
+    if jwt_token:
+        kwargs["jwt_token"] = jwt_token
+    return GoldenAPI(**kwargs)
@@ -0,0 +1,148 @@
+import argparse
+import json
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from helper import get_text_from_websites
+from models import DEFAULT_TIER, TIERS, get_tier_nlp
+from normalize import normalize_text
+
+# Bulk named entity extraction over many URLs.
+# URLs are fetched and extracted a window at a time through fetch_many, which
+# keeps to the per-host connection limit, while spaCy works through the
+# previous window with nlp.pipe, optionally over several processes. At most
+# two windows of text are held at once however slow the model is. One JSON
+# line of entities, with the fetch status or error, is written per URL.
+#
+#   python streamlit/bulk_ner.py urls.txt -o entities.jsonl --n-process 4
+#   python streamlit/bulk_ner.py urls.txt -o entities.jsonl --tier fast
+
+DEFAULT_BATCH_SIZE = 64
+DEFAULT_FETCH_WORKERS = 16
+DEFAULT_WINDOW = 256  # URLs fetched ahead of the model
+
+
+def _fetch_window(urls, fetch_workers):
+    # Only the fetch outcome travels with the text, not the page body
+    return [
+        (normalize_text(meta, content), (result.url, result.status, result.error))
+        for result, meta, content in get_text_from_websites(
+            urls, max_workers=fetch_workers
+        )
+    ]
+
+
+def iter_texts(urls, fetch_workers=DEFAULT_FETCH_WORKERS, window=DEFAULT_WINDOW):
+    # Yields (text, (url, status, error)) in the order of urls, fetching the next
+    # window in the background while the current one is consumed
+    windows = [urls[i : i + window] for i in range(0, len(urls), window)]
+    if not windows:
+        return
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        future = executor.submit(_fetch_window, windows[0], fetch_workers)
+        for next_window in windows[1:] + [None]:
+            texts = future.result()
+            if next_window is not None:
+                future = executor.submit(_fetch_window, next_window, fetch_workers)
+            yield from texts
+
+
+def doc_entities(doc):
+    return [
+        {
+            "text": ent.text,
+            "start": ent.start_char,
+            "end": ent.end_char,
+            "label": ent.label_,
+        }
+        for ent in doc.ents
+    ]
+
+
+def extract_entities(
+    urls,
+    out,
+    tier=DEFAULT_TIER,
+    batch_size=DEFAULT_BATCH_SIZE,
+    n_process=1,
+    fetch_workers=DEFAULT_FETCH_WORKERS,
+    window=DEFAULT_WINDOW,
+):
+    nlp = get_tier_nlp(tier)
+    start = time.perf_counter()
+    count = failed = 0
+    docs = nlp.pipe(
+        iter_texts(list(urls), fetch_workers, window),
+        as_tuples=True,
+        batch_size=batch_size,
+        n_process=n_process,
+    )
+    for doc, (url, status, error) in docs:
+        # A failed fetch is not a page without entities
+        record = {
+            "url": url,
+            "status": status,
+            "error": error,
+            "chars": len(doc.text),
+            "entities": doc_entities(doc),
+        }
+        out.write(json.dumps(record) + "\n")
+        count += 1
+        failed += error is not None
+    return {
+        "urls": count,
+        "failed": failed,
+        "seconds": round(time.perf_counter() - start, 3),
+    }
+
+
+def read_urls(f):
+    return [line.strip() for line in f if line.strip() and not line.startswith("#")]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Extract named entities from a list of URLs into JSONL"
+    )
+    parser.add_argument("urls", help="file with one URL per line, - for stdin")
+    parser.add_argument("-o", "--output", default="-", help="JSONL output file")
+    parser.add_argument("--tier", choices=list(TIERS), default=DEFAULT_TIER)
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--n-process", type=int, default=1)
+    parser.add_argument("--fetch-workers", type=int, default=DEFAULT_FETCH_WORKERS)
+    parser.add_argument(
+        "--window", type=int, default=DEFAULT_WINDOW, help="URLs fetched ahead"
+    )
+    args = parser.parse_args(argv)
+
+    if args.urls == "-":
+        urls = read_urls(sys.stdin)
+    else:
+        with open(args.urls) as f:
+            urls = read_urls(f)
+
+    out = sys.stdout if args.output == "-" else open(args.output, "w")
+    try:
+        stats = extract_entities(
+            urls,
+            out,
+            tier=args.tier,
+            batch_size=args.batch_size,
+            n_process=args.n_process,
+            fetch_workers=args.fetch_workers,
+            window=args.window,
+        )
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    rate = stats["urls"] / stats["seconds"] if stats["seconds"] else 0
+    print(
+        f"{stats['urls']} urls ({stats['failed']} failed) in {stats['seconds']}s "
+        f"({rate:.1f} urls/s)",
+        file=sys.stderr,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+import re
+import unicodedata
+
+from search import (
+    DEFAULT_SEARCH_BATCH_SIZE,
+    entity_choices,
+    entity_search_many,
+    normalize_query,
+)
+from submit import SubmissionEngine, batched
+
+# Pre-submit check of subject names against existing entities.
+# Rows are grouped locally by their normalized name, so each distinct name is
+# searched once, and the searches go out as batched aliased queries from the
+# submission engine's thread pool. An existing entity with the same name,
+# ignoring case and whitespace, is an exact match; one that only matches once
+# punctuation and legal suffixes are dropped is a probable match.
+
+NON_WORD_RE = re.compile(r"[\W_]+")
+LEGAL_SUFFIXES = frozenset(
+    [
+        "ag",
+        "co",
+        "company",
+        "corp",
+        "corporation",
+        "gmbh",
+        "inc",
+        "incorporated",
+        "limited",
+        "llc",
+        "ltd",
+        "plc",
+        "sa",
+    ]
+)
+
+EXACT = "exact"
+PROBABLE = "probable"
+ERROR = "error"
+
+
+def normalize_name(name):
+    # "Acme, Inc." and "ACME inc" both become "acme"
+    words = NON_WORD_RE.sub(" ", unicodedata.normalize("NFKC", name).casefold())
+    words = words.split()
+    while len(words) > 1 and words[-1] in LEGAL_SUFFIXES:
+        words.pop()
+    return " ".join(words)
+
+
+def group_names(names):
+    # {exact key: [first spelling, row count]}, in order of first appearance.
+    # names can be any iterable, memory follows the number of distinct names.
+    groups = {}
+    for name in names:
+        if not isinstance(name, str):
+            continue
+        key = normalize_query(name)
+        if not key:
+            continue
+        group = groups.get(key)
+        if group is None:
+            groups[key] = [name, 1]
+        else:
+            group[1] += 1
+    return groups
+
+
+def classify(name, choices):
+    # Best (match, (entity name, entity id)) for name among search choices
+    key = normalize_query(name)
+    for choice in choices:
+        if normalize_query(choice[0]) == key:
+            return EXACT, choice
+    normalized = normalize_name(name)
+    for choice in choices:
+        if normalize_name(choice[0]) == normalized:
+            return PROBABLE, choice
+    return None, None
+
+
+def find_existing(
+    goldapi,
+    names,
+    engine=None,
+    batch_size=DEFAULT_SEARCH_BATCH_SIZE,
+    on_progress=None,
+):
+    # Returns one report row per distinct name, in order of first appearance
+    groups = group_names(names)
+    representatives = [name for name, _ in groups.values()]
+    batches = list(batched(representatives, batch_size))
+
+    engine = engine or SubmissionEngine()
+    batch_results = engine.map(
+        lambda batch: entity_search_many(goldapi, batch, batch_size, engine=engine),
+        batches,
+        on_progress=on_progress,
+        weights=[len(batch) for batch in batches],
+    )
+    results = {}
+    failed = set()
+    for batch, batch_result in zip(batches, batch_results):
+        if isinstance(batch_result, Exception):
+            failed.update(batch)
+        else:
+            results.update(batch_result)
+
+    # Distinct names that only differ in punctuation or legal suffixes
+    similar = {}
+    for name in representatives:
+        normalized = normalize_name(name)
+        similar[normalized] = similar.get(normalized, 0) + 1
+
+    report = []
+    for name, rows in groups.values():
+        result = results.get(name) or {}
+        if name in failed or result.get("errors"):
+            match, choice = ERROR, None
+        else:
+            match, choice = classify(name, entity_choices(result))
+        report.append(
+            {
+                "name": name,
+                "rows": rows,
+                "similar_names": similar[normalize_name(name)] - 1,
+                "match": match,
+                "entity_name": choice[0] if choice else None,
+                "entity_id": choice[1] if choice else None,
+            }
+        )
+    return report
+
+
+def exact_match_keys(report):
+    return {normalize_query(r["name"]) for r in report if r["match"] == EXACT}
@@ -0,0 +1,112 @@
+import multiprocessing
+import os
+import signal
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+from helper import DEFAULT_SYNTAXES, text_from_html
+
+# Process pool for HTML boilerplate and metadata extraction.
+# boilerpy3 and extruct are CPU bound pure Python, so running them inline
+# holds the GIL and stalls every other Streamlit session. Workers are spawned
+# once and reused; each imports helper and so keeps its own module level
+# CanolaExtractor. Every document gets a time budget enforced inside the
+# worker, so one pathological page can't pin a worker forever.
+
+EXTRACT_WORKERS = int(
+    os.environ.get("DATA_APPS_EXTRACT_WORKERS", min(4, os.cpu_count() or 1))
+)
+DEFAULT_TIME_BUDGET = 10  # seconds per document
+EMPTY_TEXT = ("", "")
+
+_executor = None
+_lock = threading.Lock()
+
+
+class ExtractionTimeout(BaseException):
+    # Not an Exception, so the broad handlers in extruct and boilerpy3 that
+    # keep going after a failed syntax or parse can't swallow it
+    pass
+
+
+def _on_alarm(signum, frame):
+    raise ExtractionTimeout()
+
+
+def _extract(html_doc, url, time_budget, syntaxes):
+    # Runs in a worker process, whose tasks run on its main thread
+    use_alarm = time_budget and hasattr(signal, "setitimer")
+    if use_alarm:
+        signal.signal(signal.SIGALRM, _on_alarm)
+        signal.setitimer(signal.ITIMER_REAL, time_budget)
+    try:
+        return text_from_html(html_doc, url, syntaxes=syntaxes)
+    except ExtractionTimeout:
+        return EMPTY_TEXT
+    finally:
+        if use_alarm:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        with _lock:
+            if _executor is None:
+                # Spawned rather than forked, the Streamlit server is threaded
+                _executor = ProcessPoolExecutor(
+                    max_workers=EXTRACT_WORKERS,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+    return _executor
+
+
+def _reset_executor():
+    global _executor
+    with _lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=False)
+
+
+def submit_extract(
+    html_doc, url, time_budget=DEFAULT_TIME_BUDGET, syntaxes=DEFAULT_SYNTAXES
+):
+    # Returns a concurrent.futures.Future of (meta, content)
+    return get_executor().submit(_extract, html_doc, url, time_budget, syntaxes)
+
+
+def _result(future, time_budget):
+    # Allow for queueing and process overhead on top of the worker's budget
+    timeout = time_budget * 2 + 5 if time_budget else None
+    try:
+        return future.result(timeout=timeout)
+    except FutureTimeoutError:
+        future.cancel()
+        return EMPTY_TEXT
+    except BrokenProcessPool:
+        # A worker died (e.g. out of memory), start a fresh pool next time
+        _reset_executor()
+        return EMPTY_TEXT
+
+
+def extract_text(
+    html_doc, url, time_budget=DEFAULT_TIME_BUDGET, syntaxes=DEFAULT_SYNTAXES
+):
+    if html_doc == None:
+        return EMPTY_TEXT
+    future = submit_extract(html_doc, url, time_budget, syntaxes)
+    return _result(future, time_budget)
+
+
+def extract_many(docs, time_budget=DEFAULT_TIME_BUDGET, syntaxes=DEFAULT_SYNTAXES):
+    # docs are (html_doc, url) pairs, results keep their order
+    futures = [
+        submit_extract(html_doc, url, time_budget, syntaxes)
+        if html_doc != None
+        else None
+        for html_doc, url in docs
+    ]
+    return [_result(f, time_budget) if f else EMPTY_TEXT for f in futures]
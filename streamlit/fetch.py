@@ -0,0 +1,225 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from w3lib.encoding import html_to_unicode
+
+from cache import DiskCache, TTLCache
+
+# Pooled HTTP fetching for website text extraction.
+# One keep-alive session is shared by the whole process so repeat requests to
+# a host reuse its connections, and batches of URLs are fetched concurrently
+# under a global worker limit and a per-host limit.
+# Pages are also cached on disk: within HTTP_CACHE_TTL a cached page is served
+# without touching the network, after that it is revalidated with a
+# conditional request using its ETag/Last-Modified.
+# Bodies are streamed: non-text content types and oversized bodies are
+# rejected before they are downloaded and decoded.
+
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 12.0; rv:94.0) Gecko/20100101 Firefox/94.0"
+}
+DEFAULT_TIMEOUT = 3
+MAX_WORKERS = 32
+MAX_PER_HOST = 4
+POOL_HOSTS = 100
+# Per-host semaphores are kept for the most recently fetched hosts only. An
+# entry is only dropped long after any fetch holding it has finished.
+HOST_LIMITS_MAXSIZE = 1024
+HOST_LIMITS_TTL = 600
+# Bodies are streamed and abandoned past these limits
+MAX_BYTES = int(os.environ.get("DATA_APPS_FETCH_MAX_BYTES", 5 * 1024 * 1024))
+MAX_SECONDS = 15
+CHUNK_SIZE = 64 * 1024
+TEXT_CONTENT_TYPES = frozenset(
+    ["text/html", "application/xhtml+xml", "text/plain", "text/xml", "application/xml"]
+)
+HTTP_CACHE_TTL = int(os.environ.get("DATA_APPS_HTTP_CACHE_TTL", 60 * 60))
+HTTP_CACHE_MAX_BYTES = int(
+    os.environ.get("DATA_APPS_HTTP_CACHE_MAX_BYTES", 512 * 1024 * 1024)
+)
+
+FetchResult = namedtuple(
+    "FetchResult",
+    ["url", "text", "status", "elapsed", "error", "cached"],
+    defaults=[False],
+)
+
+logger = logging.getLogger(__name__)
+
+_session = None
+_http_cache = None
+_lock = threading.Lock()
+_host_limits = TTLCache(maxsize=HOST_LIMITS_MAXSIZE, ttl=HOST_LIMITS_TTL)
+
+
+def get_session():
+    global _session
+    if _session is None:
+        with _lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(
+                    pool_connections=POOL_HOSTS, pool_maxsize=MAX_PER_HOST
+                )
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                session.headers.update(HEADERS)
+                _session = session
+    return _session
+
+
+def _host_limit(url, max_per_host):
+    host = urlsplit(url).netloc.lower()
+    with _lock:
+        limit = _host_limits.get((host, max_per_host), None)
+        if limit is None:
+            limit = threading.Semaphore(max_per_host)
+            _host_limits.set((host, max_per_host), limit)
+    return limit
+
+
+def get_http_cache():
+    global _http_cache
+    if _http_cache is None:
+        with _lock:
+            if _http_cache is None:
+                _http_cache = DiskCache("http", HTTP_CACHE_MAX_BYTES)
+    return _http_cache
+
+
+def _cache_key(url):
+    return hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+
+def _load_entry(url):
+    data = get_http_cache().get(_cache_key(url))
+    if data is None:
+        return None
+    try:
+        entry = json.loads(data)
+    except ValueError:
+        return None
+    # Guard against hash collisions
+    return entry if entry.get("url") == url else None
+
+
+def _save_entry(url, entry):
+    # The page was fetched either way, a cache that can't be written only
+    # costs the next fetch a round trip
+    try:
+        get_http_cache().set(_cache_key(url), json.dumps(entry).encode("utf-8"))
+    except OSError as e:
+        logger.warning("Could not cache %s: %s", url, e)
+
+
+def _store_entry(url, r, text):
+    entry = {
+        "url": url,
+        "status": r.status_code,
+        "etag": r.headers.get("ETag"),
+        "last_modified": r.headers.get("Last-Modified"),
+        "fetched_at": time.time(),
+        "text": text,
+    }
+    _save_entry(url, entry)
+
+
+def _read_body(r, max_bytes, deadline):
+    # Returns (text, error). Checks the headers before reading anything and
+    # stops reading as soon as the body turns out to be too big or too slow.
+    content_type = r.headers.get("Content-Type", "")
+    mime_type = content_type.split(";")[0].strip().lower()
+    if mime_type and mime_type not in TEXT_CONTENT_TYPES:
+        return None, f"Unsupported content type {mime_type}"
+    content_length = r.headers.get("Content-Length", "")
+    if content_length.isdigit() and int(content_length) > max_bytes:
+        return None, f"Content-Length {content_length} exceeds {max_bytes} bytes"
+
+    body = bytearray()
+    for chunk in r.iter_content(CHUNK_SIZE):
+        body += chunk
+        if len(body) > max_bytes:
+            return None, f"Body exceeds {max_bytes} bytes"
+        if time.perf_counter() > deadline:
+            return None, "Body download too slow"
+
+    # Decode only once the body is accepted, with the charset from the
+    # headers, the page's meta tags or a BOM
+    _, text = html_to_unicode(content_type, bytes(body))
+    return text, None
+
+
+def fetch(url, timeout=DEFAULT_TIMEOUT, cache=True, max_bytes=MAX_BYTES):
+    start = time.perf_counter()
+    entry = _load_entry(url) if cache and url else None
+
+    def cached():
+        elapsed = time.perf_counter() - start
+        return FetchResult(url, entry["text"], entry["status"], elapsed, None, True)
+
+    def failed(status, error):
+        elapsed = time.perf_counter() - start
+        return FetchResult(url, None, status, elapsed, error)
+
+    headers = {}
+    if entry is not None:
+        if time.time() - entry["fetched_at"] < HTTP_CACHE_TTL:
+            return cached()
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+
+    try:
+        r = get_session().get(url, headers=headers, timeout=timeout, stream=True)
+    except requests.RequestException as e:
+        if entry is not None:
+            # Serving a stale page beats failing
+            return cached()
+        return failed(None, f"{type(e).__name__}: {e}")
+
+    with r:
+        if r.status_code == 304 and entry is not None:
+            entry["fetched_at"] = time.time()
+            _save_entry(url, entry)
+            return cached()
+        if r.status_code >= 400:
+            return failed(r.status_code, f"HTTP {r.status_code}")
+        try:
+            text, error = _read_body(r, max_bytes, start + MAX_SECONDS)
+        except requests.RequestException as e:
+            text, error = None, f"{type(e).__name__}: {e}"
+        if error:
+            return failed(r.status_code, error)
+
+    if cache:
+        _store_entry(url, r, text)
+    return FetchResult(url, text, r.status_code, time.perf_counter() - start, None)
+
+
+def fetch_many(
+    urls,
+    timeout=DEFAULT_TIMEOUT,
+    max_workers=MAX_WORKERS,
+    max_per_host=MAX_PER_HOST,
+    max_bytes=MAX_BYTES,
+):
+    # Results are returned in the order of urls
+    def fetch_limited(url):
+        with _host_limit(url, max_per_host):
+            return fetch(url, timeout=timeout, max_bytes=max_bytes)
+
+    urls = list(urls)
+    if not urls:
+        return []
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(urls))) as executor:
+        return list(executor.map(fetch_limited, urls))
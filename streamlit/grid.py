@@ -0,0 +1,38 @@
+import numpy as np
+import pandas as pd
+
+# Server side paging for the AgGrid preview.
+# Only one page of the backing frame is sent to the browser. Whatever the grid
+# returns is diffed against that page and just the changed cells are written
+# back into the backing frame, so an edit costs O(page size) however many rows
+# the table has.
+
+DEFAULT_PAGE_SIZE = 100
+
+
+def page_count(n_rows, page_size=DEFAULT_PAGE_SIZE):
+    return max(1, -(-n_rows // page_size))
+
+
+def page_slice(df, page, page_size=DEFAULT_PAGE_SIZE):
+    start = page * page_size
+    return df.iloc[start : start + page_size].copy()
+
+
+def cell_deltas(page, edited):
+    # [(row label, column, new value)] for every cell that differs
+    edited = pd.DataFrame(edited)
+    columns = [c for c in page.columns if c in edited.columns]
+    if len(edited) != len(page) or not columns:
+        return []
+    before = page[columns].to_numpy(dtype=object)
+    after = edited[columns].to_numpy(dtype=object)
+    same = (before == after) | (pd.isna(before) & pd.isna(after))
+    rows, cols = np.nonzero(~same)
+    return [(page.index[r], columns[c], after[r, c]) for r, c in zip(rows, cols)]
+
+
+def apply_deltas(df, deltas):
+    for label, column, value in deltas:
+        df.at[label, column] = value
+    return len(deltas)
@@ -1,40 +1,86 @@
 import extruct
-import requests
 from boilerpy3 import extractors
 from w3lib.html import get_base_url
 
+from fetch import fetch, fetch_many
+
 # Will work with website text extraction as a separate component
 
 MAX_RECURSION_DEPTH = 10
+TARGET_KEYS = frozenset(["content", "og:description"])
+SKIP_KEYS = frozenset(["microformat"])
 
 extractor = extractors.CanolaExtractor(raise_on_failure=False)
 
+# extruct syntaxes to extract. extruct parses the page once and shares the
+# tree between them. Microformats are parsed again from the raw HTML by mf2py,
+# and recursive_scan skips them anyway, so they are off by default.
+DEFAULT_SYNTAXES = ("microdata", "json-ld", "opengraph", "rdfa", "dublincore")
+
+
+def iter_scan(
+    o, target_keys=TARGET_KEYS, skip_keys=SKIP_KEYS, max_depth=MAX_RECURSION_DEPTH
+):
+    # Lazily yields the values of target_keys found anywhere in nested
+    # dicts/lists, depth first in document order, without recursion. Keys in
+    # skip_keys are not descended into. Pass frozensets to skip the conversion.
+    if not isinstance(target_keys, (set, frozenset)):
+        target_keys = frozenset(target_keys)
+    if not isinstance(skip_keys, (set, frozenset)):
+        skip_keys = frozenset(skip_keys)
+    if max_depth <= 1:
+        return
 
-def recursive_scan(
-    o, target_keys=["content", "og:description"], skip_keys=["microformat"], depth=1
-):  # noqa: B950
-    if depth >= MAX_RECURSION_DEPTH:
-        return []
-    results = []
+    # Each entry holds an iterator over a container's children, whether the
+    # container is a dict, and the depth of the children
     if isinstance(o, dict):
-        for k in o.keys():
-            if k in skip_keys:
-                continue
-            if k in target_keys:
-                # print("depth:", depth)
-                results.append(o[k])
-            results.extend(recursive_scan(o[k], depth=depth + 1))
-    if isinstance(o, list):
-        for item in o:
-            results.extend(recursive_scan(item, depth=depth + 1))
-    return results
-
-
-def meta_from_website(html_doc, url):
-    base_url = get_base_url(html_doc, url)
-    meta = extruct.extract(html_doc, base_url=base_url)
-    text = recursive_scan(meta)
-    text = ". ".join([item for item in text if item.strip() != ""])
+        stack = [(iter(o.items()), True, 2)]
+    elif isinstance(o, list):
+        stack = [(iter(o), False, 2)]
+    else:
+        return
+    while stack:
+        children, is_dict, depth = stack[-1]
+        for child in children:
+            if is_dict:
+                key, child = child
+                if key in skip_keys:
+                    continue
+                if key in target_keys:
+                    yield child
+            if depth < max_depth:
+                if isinstance(child, dict):
+                    stack.append((iter(child.items()), True, depth + 1))
+                    break
+                if isinstance(child, list):
+                    stack.append((iter(child), False, depth + 1))
+                    break
+        else:
+            stack.pop()
+
+
+def recursive_scan(o, target_keys=TARGET_KEYS, skip_keys=SKIP_KEYS, depth=1):
+    return list(
+        iter_scan(o, target_keys, skip_keys, max_depth=MAX_RECURSION_DEPTH - depth + 1)
+    )
+
+
+def extract_metadata(html_doc, url, syntaxes=DEFAULT_SYNTAXES):
+    # A syntax that fails to extract is logged by extruct and left out
+    return extruct.extract(
+        html_doc,
+        base_url=get_base_url(html_doc, url),
+        syntaxes=list(syntaxes),
+        errors="log",
+    )
+
+
+def meta_from_website(html_doc, url, syntaxes=DEFAULT_SYNTAXES):
+    meta = extract_metadata(html_doc, url, syntaxes=syntaxes)
+    text = iter_scan(meta)
+    text = ". ".join(
+        [item for item in text if isinstance(item, str) and item.strip() != ""]
+    )
     return text
 
 
@@ -51,21 +97,31 @@ def boil_html(html_doc):
 
 
 def fetch_content(url):
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 12.0; rv:94.0) Gecko/20100101 Firefox/94.0"
-    }
-    try:
-        r = requests.get(url, headers=headers, timeout=3)
-    except Exception as e:
-        print(f"URL FAILURE: {url}")
-        return None
-    return r.text
+    # Failure reasons and timings are available from fetch.fetch directly
+    return fetch(url).text
 
 
-def get_text_from_website(url):
-    html_doc = fetch_content(url)
+def text_from_html(html_doc, url, syntaxes=DEFAULT_SYNTAXES):
     if html_doc == None:
         return "", ""
-    meta = meta_from_website(html_doc, url)
+    meta = meta_from_website(html_doc, url, syntaxes=syntaxes)
     boiled_content = boil_html(html_doc)
     return meta, boiled_content
+
+
+def get_text_from_website(url, syntaxes=DEFAULT_SYNTAXES):
+    # Extraction runs in a process pool so it doesn't block other sessions
+    from extract import extract_text
+
+    html_doc = fetch_content(url)
+    return extract_text(html_doc, url, syntaxes=syntaxes)
+
+
+def get_text_from_websites(urls, syntaxes=DEFAULT_SYNTAXES, **fetch_kwargs):
+    # Fetches concurrently, returns (fetch result, meta, content) per url
+    from extract import extract_many
+
+    results = fetch_many(urls, **fetch_kwargs)
+    docs = [(result.text, result.url) for result in results]
+    texts = extract_many(docs, syntaxes=syntaxes)
+    return [(result,) + text for result, text in zip(results, texts)]
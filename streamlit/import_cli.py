@@ -0,0 +1,223 @@
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from api import golden_api
+from ingest import (
+    DEFAULT_CHUNKSIZE,
+    load_mapping,
+    read_chunks,
+    stream_create_entity_inputs,
+)
+from journal import SubmissionJournal, input_key, journal_path
+from schema import get_schema
+from submit import (
+    DEFAULT_BATCH_SIZE,
+    DEFAULT_CONCURRENCY,
+    DEFAULT_RATE,
+    SubmissionEngine,
+    created_entity,
+    result_errors,
+    submit_create_entities,
+)
+from validate import validate
+
+# Headless version of the Data Table Import page, for scheduled imports.
+# The mapping (subject column, template, column -> predicate) is the JSON
+# file downloaded from the page. The file is read in chunks; while one chunk
+# is being submitted the next is read, validated and turned into inputs on a
+# background thread. Created entities go to the same journal as the page, so
+# a rerun after a failure only submits what is left.
+#
+#   GOLDEN_JWT_TOKEN=... python streamlit/import_cli.py feed.csv mapping.json
+
+STAGES = ("read", "validate", "build", "submit")
+
+
+class StageTimer:
+    def __init__(self):
+        self.seconds = dict.fromkeys(STAGES, 0.0)
+
+    def timed(self, stage, fn):
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.seconds[stage] += time.perf_counter() - start
+
+        return wrapper
+
+    def iterate(self, stage, iterable):
+        iterator = iter(iterable)
+        next_item = self.timed(stage, next)
+        while True:
+            try:
+                item = next_item(iterator)
+            except StopIteration:
+                return
+            yield item
+
+
+def prefetch(iterable):
+    # Produces the next item on a background thread while the caller works
+    # on the current one
+    done = object()
+    iterator = iter(iterable)
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        future = executor.submit(next, iterator, done)
+        while True:
+            item = future.result()
+            if item is done:
+                return
+            future = executor.submit(next, iterator, done)
+            yield item
+
+
+def run_import(
+    path,
+    mapping,
+    goldapi,
+    engine,
+    journal,
+    chunksize=DEFAULT_CHUNKSIZE,
+    batch_size=DEFAULT_BATCH_SIZE,
+    resume=True,
+    skip_invalid=True,
+    failures=None,
+):
+    schema = get_schema()
+    subject_col = mapping["subject_column"]
+    triple_col_map = mapping["predicates"]
+    template_entity_id = schema.templates[mapping["template"]]["entityId"]
+    columns = [subject_col] + list(triple_col_map)
+
+    timer = StageTimer()
+    stats = {"rows": 0, "created": 0, "failed": 0, "skipped": 0, "invalid": 0}
+
+    def valid_rows(chunk):
+        mask = validate(chunk, subject_col, triple_col_map, schema.predicates)
+        valid = ~mask.any(axis=1)
+        stats["invalid"] += int((~valid).sum())
+        return valid.to_numpy()
+
+    def counted(chunks):
+        for chunk in chunks:
+            stats["rows"] += len(chunk)
+            yield chunk
+
+    chunks = counted(
+        timer.iterate("read", read_chunks(path, chunksize, columns=columns))
+    )
+    submissions = stream_create_entity_inputs(
+        chunks,
+        subject_col,
+        triple_col_map,
+        schema.predicates,
+        template_entity_id,
+        row_filter=timer.timed("validate", valid_rows) if skip_invalid else None,
+    )
+
+    def record_result(key, row, result):
+        entity = created_entity(result)
+        if entity:
+            journal.record(key, entity)
+            stats["created"] += 1
+        else:
+            stats["failed"] += 1
+            if failures:
+                failures.write(
+                    json.dumps({"row": row, "errors": result_errors(result)}) + "\n"
+                )
+
+    start = time.perf_counter()
+    # Building the inputs includes validating them, which is timed on its own
+    for start_row, rows, inputs in prefetch(timer.iterate("build", submissions)):
+        keys = [input_key(create_entity_input) for create_entity_input in inputs]
+        pending = [i for i, key in enumerate(keys) if not (resume and key in journal)]
+        stats["skipped"] += len(inputs) - len(pending)
+        timer.timed("submit", submit_create_entities)(
+            goldapi,
+            engine,
+            [inputs[i] for i in pending],
+            batch_size=batch_size,
+            on_result=lambda j, result: record_result(
+                keys[pending[j]], rows[pending[j]], result
+            ),
+        )
+
+    timer.seconds["build"] -= timer.seconds["read"] + timer.seconds["validate"]
+    stats["seconds"] = round(time.perf_counter() - start, 3)
+    stats["retries"] = engine.retries
+    stats["stages"] = {k: round(v, 3) for k, v in timer.seconds.items()}
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Create entities from a table file with a saved column mapping"
+    )
+    parser.add_argument(
+        "file", help="CSV, Parquet, Arrow IPC/Feather or XLSX file to import"
+    )
+    parser.add_argument("mapping", help="mapping JSON downloaded from the page")
+    parser.add_argument(
+        "--jwt-token",
+        default=os.environ.get("GOLDEN_JWT_TOKEN", ""),
+        help="API key, defaults to $GOLDEN_JWT_TOKEN",
+    )
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE)
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY)
+    parser.add_argument("--rate", type=float, default=DEFAULT_RATE)
+    parser.add_argument("--journal", help="journal name, defaults to the file name")
+    parser.add_argument(
+        "--no-resume",
+        action="store_true",
+        help="submit rows even if the journal has them",
+    )
+    parser.add_argument(
+        "--keep-invalid",
+        action="store_true",
+        help="submit rows with values that fail validation",
+    )
+    parser.add_argument("--failures", help="JSONL file for rows that failed")
+    args = parser.parse_args(argv)
+
+    mapping = load_mapping(args.mapping)
+    goldapi = golden_api(args.jwt_token)
+    engine = SubmissionEngine(
+        args.jwt_token, concurrency=args.concurrency, rate=args.rate
+    )
+    journal_name = args.journal or os.path.basename(args.file)
+
+    failures = open(args.failures, "w") if args.failures else None
+    try:
+        with SubmissionJournal(journal_path(journal_name)) as journal:
+            stats = run_import(
+                args.file,
+                mapping,
+                goldapi,
+                engine,
+                journal,
+                chunksize=args.chunksize,
+                batch_size=args.batch_size,
+                resume=not args.no_resume,
+                skip_invalid=not args.keep_invalid,
+                failures=failures,
+            )
+    finally:
+        if failures:
+            failures.close()
+
+    rate = stats["rows"] / stats["seconds"] if stats["seconds"] else 0
+    stats["rows_per_second"] = round(rate, 1)
+    print(json.dumps(stats), file=sys.stderr)
+    return 1 if stats["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,289 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+import pyarrow.parquet as pq
+from godel.schema import CreateEntityInput, StatementInputRecordInput
+
+# Row -> CreateEntityInput construction for table imports.
+# Large files are never held in memory whole: they are read in chunks and
+# each chunk is turned into inputs and submitted before the next is read.
+# CSV, Parquet, Arrow IPC/Feather and XLSX files are read into the same shape,
+# string values with missing cells as nulls, and only the requested columns
+# are read. Arrow formats are memory mapped from disk, or read from the
+# uploaded buffer without copying it.
+
+DEFAULT_CHUNKSIZE = 10000
+PREVIEW_ROWS = 1000
+DELIMITER = ", "
+# Version of the mapping files saved by the page and read by import_cli
+MAPPING_VERSION = 1
+
+TABLE_FORMATS = {
+    ".csv": "csv",
+    ".parquet": "parquet",
+    ".pq": "parquet",
+    ".arrow": "arrow",
+    ".feather": "arrow",
+    ".ipc": "arrow",
+    ".xlsx": "xlsx",
+}
+
+
+def table_format(file):
+    # Paths and uploads both have a name, CSV is assumed otherwise
+    name = os.fspath(file) if isinstance(file, (str, os.PathLike)) else ""
+    name = getattr(file, "name", name) or ""
+    return TABLE_FORMATS.get(os.path.splitext(name)[1].lower(), "csv")
+
+
+def _rewind(file):
+    if hasattr(file, "seek"):
+        file.seek(0)
+    return file
+
+
+def _arrow_source(file):
+    if isinstance(file, (str, os.PathLike)):
+        return pa.memory_map(os.fspath(file))
+    if hasattr(file, "getbuffer"):
+        return pa.BufferReader(pa.py_buffer(file.getbuffer()))
+    return _rewind(file)
+
+
+def _read_arrow(file, columns=None):
+    # The source is already mapped or buffered, so feather must not map it
+    return feather.read_table(_arrow_source(file), columns=columns, memory_map=False)
+
+
+def _string_column(column):
+    if pa.types.is_timestamp(column.type):
+        # Midnight values read as plain dates, others keep their time, the
+        # way they would be written to a CSV
+        values = column.to_pandas().map(
+            lambda v: v.date().isoformat() if v == v.normalize() else v.isoformat(),
+            na_action="ignore",
+        )
+        return pa.array(values, pa.string(), from_pandas=True)
+    try:
+        return column.cast(pa.string())
+    except pa.ArrowNotImplementedError:
+        # Nested types have no cast to string
+        values = column.to_pylist()
+        return pa.array([None if v is None else str(v) for v in values], pa.string())
+
+
+def _string_frame(table):
+    # Same values read_csv(dtype=str) would give for the table
+    columns = [_string_column(column) for column in table.columns]
+    return pa.Table.from_arrays(columns, names=table.column_names).to_pandas()
+
+
+def table_columns(file):
+    # Column names without reading the rows
+    table_type = table_format(file)
+    if table_type == "parquet":
+        return list(pq.read_schema(_arrow_source(file)).names)
+    if table_type == "arrow":
+        return list(pa.ipc.open_file(_arrow_source(file)).schema.names)
+    if table_type == "xlsx":
+        return list(pd.read_excel(_rewind(file), nrows=0, engine="openpyxl").columns)
+    return list(pd.read_csv(_rewind(file), nrows=0).columns)
+
+
+def read_table(file, columns=None):
+    table_type = table_format(file)
+    if table_type == "parquet":
+        return _string_frame(pq.read_table(_arrow_source(file), columns=columns))
+    if table_type == "arrow":
+        return _string_frame(_read_arrow(file, columns))
+    if table_type == "xlsx":
+        return pd.read_excel(
+            _rewind(file), usecols=columns, dtype=str, engine="openpyxl"
+        )
+    # Values are submitted as strings, so don't let pandas guess types
+    return pd.read_csv(_rewind(file), usecols=columns, dtype=str)
+
+
+def _frame_chunks(df, chunksize):
+    for start in range(0, len(df), chunksize):
+        yield df.iloc[start : start + chunksize]
+
+
+def _batch_chunks(batches):
+    # Row labels continue across chunks, as they do for read_csv chunks
+    start = 0
+    for batch in batches:
+        chunk = _string_frame(pa.Table.from_batches([batch]))
+        chunk.index = pd.RangeIndex(start, start + len(chunk))
+        start += len(chunk)
+        yield chunk
+
+
+def read_chunks(file, chunksize=DEFAULT_CHUNKSIZE, columns=None):
+    table_type = table_format(file)
+    if table_type == "parquet":
+        batches = pq.ParquetFile(_arrow_source(file)).iter_batches(
+            batch_size=chunksize, columns=columns
+        )
+        return _batch_chunks(batches)
+    if table_type == "arrow":
+        # Memory mapped, so reading the whole table doesn't load it
+        table = _read_arrow(file, columns)
+        return _batch_chunks(table.to_batches(max_chunksize=chunksize))
+    if table_type == "xlsx":
+        # Workbooks can't be read in pieces
+        return _frame_chunks(read_table(file, columns), chunksize)
+    return pd.read_csv(_rewind(file), chunksize=chunksize, usecols=columns, dtype=str)
+
+
+def mapping_config(subject_col, template, triple_col_map):
+    return {
+        "version": MAPPING_VERSION,
+        "subject_column": subject_col,
+        "template": template,
+        "predicates": dict(triple_col_map),
+    }
+
+
+def load_mapping(path):
+    with open(path) as f:
+        mapping = json.load(f)
+    if mapping.get("version") != MAPPING_VERSION:
+        raise ValueError(f"Unsupported mapping version: {mapping.get('version')}")
+    return mapping
+
+
+def sample_chunks(chunks, n=PREVIEW_ROWS, seed=0):
+    # Uniform sample of n rows over any number of chunks in bounded memory:
+    # every row gets a random key and only the n smallest keys are kept.
+    rng = np.random.default_rng(seed)
+    sample = None
+    total_rows = 0
+    for chunk in chunks:
+        total_rows += len(chunk)
+        chunk = chunk.assign(_sample_key=rng.random(len(chunk)))
+        if sample is not None:
+            chunk = pd.concat([sample, chunk])
+        sample = chunk.nsmallest(n, "_sample_key")
+    if sample is None:
+        return pd.DataFrame([]), 0
+    sample = sample.sort_index().drop(columns="_sample_key")
+    return sample, total_rows
+
+
+def build_statement_table(df, triple_col_map, predicates):
+    # One row per statement: (row, predicate_id, object_type, object_value),
+    # built with whole-column operations. Expects a positional index.
+    frames = []
+    for pred_col, pred_name in triple_col_map.items():
+        values = df[pred_col].dropna().astype(str).str.split(DELIMITER).explode()
+        values = values[values.str.len() > 0]
+        frames.append(
+            pd.DataFrame(
+                {
+                    "row": values.index.to_numpy(dtype=np.int64),
+                    "predicate_id": predicates[pred_name]["id"],
+                    "object_type": predicates[pred_name]["objectType"],
+                    "object_value": values.to_numpy(),
+                }
+            )
+        )
+    if not frames:
+        return pd.DataFrame(
+            {
+                "row": np.array([], dtype=np.int64),
+                "predicate_id": [],
+                "object_type": [],
+                "object_value": [],
+            }
+        )
+    # Stable sort keeps column order, then split order, within each row
+    table = pd.concat(frames, ignore_index=True)
+    return table.sort_values("row", kind="stable", ignore_index=True)
+
+
+def build_create_entity_inputs(
+    df, subject_col, triple_col_map, predicates, template_entity_id, valid=None
+):
+    # Returns the positions of the rows that produced an input and the inputs.
+    # Rows without a subject name, or False in the valid mask, are skipped.
+    df = df.reset_index(drop=True)
+    table = build_statement_table(df, triple_col_map, predicates)
+
+    rows = table["row"].to_numpy()
+    predicate_ids = table["predicate_id"].to_numpy()
+    object_values = table["object_value"].to_numpy()
+    is_entity = (table["object_type"] == "ENTITY").to_numpy()
+    # Statements of row r are table[bounds[r]:bounds[r + 1]]
+    bounds = np.searchsorted(rows, np.arange(len(df) + 1))
+
+    names = df[subject_col].to_numpy() if len(df) else []
+    has_name = df[subject_col].notna().to_numpy() if len(df) else []
+    if valid is not None:
+        has_name = has_name & np.asarray(valid, dtype=bool)
+
+    # Every entity shares the same "Is a" template statement
+    template_statement = StatementInputRecordInput(
+        predicate_id=predicates["Is a"]["id"],
+        object_entity_id=template_entity_id,
+        citation_urls=[],
+        qualifiers=[],
+    )
+
+    input_rows = []
+    create_entity_inputs = []
+    for row in range(len(df)):
+        if not has_name[row]:
+            continue
+        statements = [template_statement]
+        for j in range(bounds[row], bounds[row + 1]):
+            if is_entity[j]:
+                statement = StatementInputRecordInput(
+                    predicate_id=predicate_ids[j],
+                    object_entity_id=object_values[j],
+                    citation_urls=[],
+                    qualifiers=[],
+                )
+            else:
+                statement = StatementInputRecordInput(
+                    predicate_id=predicate_ids[j],
+                    object_value=object_values[j],
+                    citation_urls=[],
+                    qualifiers=[],
+                )
+            statements.append(statement)
+        input_rows.append(row)
+        create_entity_inputs.append(
+            CreateEntityInput(name=str(names[row]), statements=statements)
+        )
+
+    return input_rows, create_entity_inputs
+
+
+def stream_create_entity_inputs(
+    chunks,
+    subject_col,
+    triple_col_map,
+    predicates,
+    template_entity_id,
+    row_filter=None,
+):
+    # Yields (first row number, input rows, inputs) for each chunk, with input
+    # rows numbered from the start of the file. row_filter(chunk) can return
+    # a mask of the rows to keep.
+    row = 0
+    for chunk in chunks:
+        input_rows, create_entity_inputs = build_create_entity_inputs(
+            chunk,
+            subject_col,
+            triple_col_map,
+            predicates,
+            template_entity_id,
+            valid=row_filter(chunk) if row_filter else None,
+        )
+        yield row, [row + r for r in input_rows], create_entity_inputs
+        row += len(chunk)
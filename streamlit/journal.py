@@ -0,0 +1,108 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+from cache import cache_path
+
+# Append-only journal of submitted entities, so an interrupted import can
+# resume where it stopped instead of creating every entity again.
+# Each line maps the content hash of a CreateEntityInput to the entity that
+# was created for it. Lines are flushed as they are written and fsynced in
+# batches; a crash can lose at most the last unsynced batch, whose rows are
+# then submitted again on resume.
+
+DEFAULT_SYNC_EVERY = 100  # records
+DEFAULT_SYNC_INTERVAL = 1.0  # seconds
+
+
+def input_key(create_entity_input):
+    value = create_entity_input.__to_json_value__()
+    canonical = json.dumps(value, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def journal_path(name):
+    safe_name = "".join(c if c.isalnum() or c in "-_." else "_" for c in name)
+    return cache_path("journals", f"{safe_name or 'import'}.jsonl")
+
+
+class SubmissionJournal:
+    def __init__(
+        self,
+        path,
+        sync_every=DEFAULT_SYNC_EVERY,
+        sync_interval=DEFAULT_SYNC_INTERVAL,
+    ):
+        self.path = path
+        self.sync_every = sync_every
+        self.sync_interval = sync_interval
+        self.entries = {}
+        self._lock = threading.Lock()
+        self._unsynced = 0
+        self._synced_at = time.monotonic()
+        self._load()
+        self._file = open(path, "a", encoding="utf-8")
+        # A crash can leave a partial last line, start on a fresh one
+        if self._file.tell() and not self._ends_with_newline():
+            self._file.write("\n")
+
+    def _load(self):
+        try:
+            f = open(self.path, encoding="utf-8")
+        except FileNotFoundError:
+            return
+        with f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                    self.entries[record["key"]] = record["entity"]
+                except (ValueError, KeyError, TypeError):
+                    continue
+
+    def _ends_with_newline(self):
+        with open(self.path, "rb") as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b"\n"
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key):
+        return self.entries.get(key)
+
+    def record(self, key, entity):
+        line = json.dumps({"key": key, "entity": entity}, separators=(",", ":"))
+        with self._lock:
+            self.entries[key] = entity
+            self._file.write(line + "\n")
+            self._file.flush()
+            self._unsynced += 1
+            if (
+                self._unsynced >= self.sync_every
+                or time.monotonic() - self._synced_at >= self.sync_interval
+            ):
+                self._sync()
+
+    def _sync(self):
+        os.fsync(self._file.fileno())
+        self._unsynced = 0
+        self._synced_at = time.monotonic()
+
+    def close(self):
+        with self._lock:
+            if self._file.closed:
+                return
+            self._file.flush()
+            self._sync()
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,119 @@
+import hashlib
+import os
+import resource
+import sys
+import threading
+import time
+
+import spacy
+
+# Process-wide registry of loaded spaCy pipelines.
+# Streamlit re-runs page scripts on every widget change, but imported modules
+# stay in sys.modules, so pipelines loaded here survive reruns and are shared
+# by every session in the server process.
+
+DEFAULT_MODEL = "en_core_web_md"
+
+# Text to Triples only reads doc.ents, so the components feeding POS tags,
+# lemmas and dependency parses are never needed. Excluded components are not
+# even deserialized, which keeps their weights out of memory.
+NER_ONLY_EXCLUDE = ("tagger", "parser", "attribute_ruler", "lemmatizer")
+# The ner component of the small and medium pipelines has its own embedding
+# layer, so the shared tok2vec and sentence recognizer can go too
+NER_COMPONENT_ONLY_EXCLUDE = NER_ONLY_EXCLUDE + ("tok2vec", "senter")
+
+ENTITY_PATTERNS_PATH = os.path.join(
+    os.path.dirname(__file__), "data", "entity_patterns.jsonl"
+)
+
+# Speed/accuracy tiers for NER, cheapest first. "fast" runs en_core_web_sm,
+# "rules" only tags the organizations listed in the patterns file.
+TIERS = {
+    "rules": {"patterns": ENTITY_PATTERNS_PATH},
+    "fast": {"model": "en_core_web_sm", "exclude": NER_COMPONENT_ONLY_EXCLUDE},
+    "md": {"model": DEFAULT_MODEL, "exclude": NER_ONLY_EXCLUDE},
+}
+DEFAULT_TIER = "md"
+
+_models = {}
+_stats = {}
+_registry_lock = threading.Lock()
+_load_locks = {}
+
+
+def _rss_mb():
+    # ru_maxrss is reported in KB on Linux and in bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin":
+        return rss / (1024 * 1024)
+    return rss / 1024
+
+
+def _load(key, loader, **stats):
+    nlp = _models.get(key)
+    if nlp is not None:
+        return nlp
+
+    # One lock per pipeline so concurrent sessions asking for the same model
+    # wait for a single load instead of each loading their own copy.
+    with _registry_lock:
+        load_lock = _load_locks.setdefault(key, threading.Lock())
+
+    with load_lock:
+        nlp = _models.get(key)
+        if nlp is not None:
+            return nlp
+
+        rss_before = _rss_mb()
+        start = time.perf_counter()
+        nlp = loader()
+        load_seconds = time.perf_counter() - start
+
+        _stats[key] = dict(
+            stats,
+            version=nlp.meta.get("version"),
+            pipeline=list(nlp.pipe_names),
+            load_seconds=round(load_seconds, 3),
+            max_rss_delta_mb=round(_rss_mb() - rss_before, 1),
+        )
+        _models[key] = nlp
+    return nlp
+
+
+def get_nlp(name=DEFAULT_MODEL, exclude=NER_ONLY_EXCLUDE):
+    key = (name, tuple(sorted(exclude)))
+    return _load(
+        key,
+        lambda: spacy.load(name, exclude=list(exclude)),
+        model=name,
+        excluded=list(exclude),
+    )
+
+
+def build_rules_pipeline(patterns_path=ENTITY_PATTERNS_PATH):
+    with open(patterns_path, "rb") as f:
+        digest = hashlib.sha256(f.read()).hexdigest()
+    nlp = spacy.blank("en")
+    ruler = nlp.add_pipe("entity_ruler")
+    ruler.from_disk(patterns_path)
+    # Identifies the pipeline, and so its cached results, by its patterns
+    nlp.meta["name"] = "entity_rules"
+    nlp.meta["version"] = digest[:12]
+    return nlp
+
+
+def get_tier_nlp(tier=DEFAULT_TIER):
+    config = TIERS[tier]
+    if "patterns" in config:
+        return _load(
+            ("rules", config["patterns"]),
+            lambda: build_rules_pipeline(config["patterns"]),
+            model="rules",
+            patterns=config["patterns"],
+        )
+    return get_nlp(config["model"], config["exclude"])
+
+
+def model_stats():
+    stats = [dict(s) for s in _stats.values()]
+    return {"models": stats, "process_max_rss_mb": round(_rss_mb(), 1)}
@@ -0,0 +1,69 @@
+import hashlib
+import os
+
+from spacy.tokens import DocBin
+
+from cache import DiskCache, TTLCache
+
+# NER results cached by a hash of the text and the model that produced them.
+# Memory holds a compact (start_char, end_char, label) table per text, which
+# is turned back into a Doc with the tokenizer alone. Disk holds DocBins so
+# results survive restarts, evicted least recently used past a size cap.
+
+NER_CACHE_MAX_BYTES = int(
+    os.environ.get("DATA_APPS_NER_CACHE_MAX_BYTES", 256 * 1024 * 1024)
+)
+
+_entities = TTLCache(maxsize=512, ttl=24 * 60 * 60)
+_docbins = None
+
+
+def _get_docbins():
+    global _docbins
+    if _docbins is None:
+        _docbins = DiskCache("ner", NER_CACHE_MAX_BYTES)
+    return _docbins
+
+
+def text_key(nlp, text):
+    model = f"{nlp.meta.get('lang')}_{nlp.meta.get('name')}-{nlp.meta.get('version')}"
+    pipeline = ",".join(nlp.pipe_names)
+    digest = hashlib.sha256(f"{model}:{pipeline}\0".encode("utf-8"))
+    digest.update(text.encode("utf-8"))
+    return digest.hexdigest()
+
+
+def entity_table(doc):
+    return tuple((ent.start_char, ent.end_char, ent.label_) for ent in doc.ents)
+
+
+def doc_from_table(nlp, text, table):
+    doc = nlp.make_doc(text)
+    spans = [doc.char_span(start, end, label=label) for start, end, label in table]
+    doc.ents = [span for span in spans if span is not None]
+    return doc
+
+
+def analyze(nlp, text):
+    key = text_key(nlp, text)
+
+    table = _entities.get(key)
+    if table is not TTLCache.MISSING:
+        return doc_from_table(nlp, text, table)
+
+    data = _get_docbins().get(key)
+    if data is not None:
+        doc = next(DocBin().from_bytes(data).get_docs(nlp.vocab))
+    else:
+        doc = nlp(text)
+        docbin = DocBin(attrs=["ENT_IOB", "ENT_TYPE"], docs=[doc])
+        _get_docbins().set(key, docbin.to_bytes())
+
+    _entities.set(key, entity_table(doc))
+    return doc
+
+
+def ner_cache_stats():
+    stats = {"memory": _entities.stats()}
+    stats["disk"] = _get_docbins().stats()
+    return stats
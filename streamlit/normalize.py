@@ -0,0 +1,100 @@
+import hashlib
+import os
+import re
+
+import numpy as np
+
+# Text normalization between website extraction and NER.
+# Metadata and boilerplate-stripped content repeat themselves (OpenGraph
+# descriptions, nav text, cookie banners), so text is split into sentences
+# and exact and near duplicate sentences are dropped before spaCy sees it.
+# The result is capped so NER time follows unique content, not page size.
+
+MAX_CHARS = int(os.environ.get("DATA_APPS_NER_MAX_CHARS", 100000))
+# Near duplicates: simhash over word shingles, compared in 4 bands of 16 bits
+SIMHASH_MIN_WORDS = 5
+SIMHASH_MAX_DISTANCE = 3
+SIMHASH_BANDS = 4
+
+# Break after ., ! or ? followed by whitespace and an uppercase letter, digit
+# or opening quote/bracket, and at line breaks
+SENTENCE_BREAK_RE = re.compile(r"(?<=[.!?])\s+(?=[\"'“‘(\[]?[A-Z0-9])|\s*\n\s*")
+WHITESPACE_RE = re.compile(r"\s+")
+# Near duplicate keys ignore case and punctuation
+NON_WORD_RE = re.compile(r"[\W_]+")
+
+
+def split_sentences(text):
+    for sentence in SENTENCE_BREAK_RE.split(text):
+        sentence = WHITESPACE_RE.sub(" ", sentence).strip()
+        if sentence:
+            yield sentence
+
+
+def _digest(text):
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest()
+
+
+def simhash(words):
+    # Each bit is set when most word 3-shingle hashes have it set
+    shingles = [" ".join(s) for s in zip(words, words[1:], words[2:])]
+    hashes = np.frombuffer(b"".join(_digest(s) for s in shingles), dtype=np.uint8)
+    bits = np.unpackbits(hashes.reshape(-1, 8), axis=1)
+    majority = bits.sum(axis=0) * 2 > len(shingles)
+    return int.from_bytes(np.packbits(majority).tobytes(), "big")
+
+
+class SentenceDeduper:
+    def __init__(self):
+        self.exact = set()
+        self.near = set()
+        self.bands = [dict() for _ in range(SIMHASH_BANDS)]
+
+    def _band_keys(self, h):
+        width = 64 // SIMHASH_BANDS
+        return [(h >> (i * width)) & ((1 << width) - 1) for i in range(SIMHASH_BANDS)]
+
+    def _seen_similar(self, h):
+        # Any sentence within SIMHASH_MAX_DISTANCE bits shares at least one band
+        band_keys = self._band_keys(h)
+        for band, key in zip(self.bands, band_keys):
+            for other in band.get(key, ()):
+                if bin(h ^ other).count("1") <= SIMHASH_MAX_DISTANCE:
+                    return True
+        for band, key in zip(self.bands, band_keys):
+            band.setdefault(key, []).append(h)
+        return False
+
+    def is_duplicate(self, sentence):
+        exact_key = _digest(sentence)
+        if exact_key in self.exact:
+            return True
+        self.exact.add(exact_key)
+
+        key = NON_WORD_RE.sub(" ", sentence.casefold()).strip()
+        near_key = _digest(key)
+        if near_key in self.near:
+            return True
+        self.near.add(near_key)
+
+        words = key.split()
+        if len(words) >= SIMHASH_MIN_WORDS and self._seen_similar(simhash(words)):
+            return True
+        return False
+
+
+def normalize_text(*parts, max_chars=MAX_CHARS):
+    deduper = SentenceDeduper()
+    sentences = []
+    length = 0
+    for part in parts:
+        for sentence in split_sentences(part or ""):
+            if deduper.is_duplicate(sentence):
+                continue
+            if sentence[-1] not in ".!?":
+                sentence += "."
+            if length + len(sentence) > max_chars:
+                return " ".join(sentences)
+            sentences.append(sentence)
+            length += len(sentence) + 1
+    return " ".join(sentences)
@@ -5,11 +5,15 @@ from io import StringIO
 import pandas as pd
 import spacy_streamlit
 import streamlit as st
-from godel import GoldenAPI
 from godel.schema import CreateEntityInput, StatementInputRecordInput
 from st_aggrid import AgGrid, DataReturnMode, GridOptionsBuilder, GridUpdateMode
 from st_aggrid.shared import AgGridTheme
 
+from api import golden_api
+from schema import get_schema
+from search import entity_search, search_stats
+from submit import SubmissionEngine
+
 st.set_page_config(layout="wide")
 
 st.markdown("# Create Entity")
@@ -54,29 +58,18 @@ jwt_token = st.text_input("JWT:", "")
 
 st.write("## Get Started")
 
-if jwt_token:
-    goldapi = GoldenAPI(jwt_token=jwt_token)
-else:
-    goldapi = GoldenAPI()
-
-# Retrieve predicate and template data
-predicates = {}
-predicates_inverse = {}
-for p in goldapi.predicates()["data"]["predicates"]["edges"]:
-    p = p["node"]
-    predicates[p["name"]] = {"id": p["id"], "objectType": p["objectType"]}
-    predicates_inverse[p["id"]] = {"name": p["name"], "objectType": p["objectType"]}
-predicates_df = pd.DataFrame(predicates).transpose()
-
-templates = {}
-for t in goldapi.templates()["data"]["templates"]["edges"]:
-    t = t["node"]
-    templates[t["entity"]["name"]] = {
-        "id": t["id"],
-        "entityId": t["entityId"],
-        "entityDescription": t["entity"]["description"],
-    }
-templates_df = pd.DataFrame(templates).transpose()
+with st.sidebar.expander("Entity search cache"):
+    st.json(search_stats())
+
+goldapi = golden_api(jwt_token)
+
+# Shared predicate and template data, refreshed in the background
+schema = get_schema()
+predicates = schema.predicates
+predicates_inverse = schema.predicates_inverse
+predicates_df = schema.predicates_df
+templates = schema.templates
+templates_df = schema.templates_df
 
 
 ################################
@@ -96,7 +89,7 @@ with st.container():
     # Get entity text options
     subject = st.text_input("Subject name")
     # Disambiguate entity
-    subject_search_results = goldapi.entity_search(subject)
+    subject_search_results = entity_search(goldapi, subject)
     try:
         subject_search_choices = (
             subject_search_results.get("data", {})
@@ -127,7 +120,7 @@ with st.container():
 
     template_entity = st.selectbox(
         "'Is a' Templates",
-        sorted(templates_df.index),
+        schema.template_names,
     )
     template_entity_id = templates_df.entityId[template_entity]
 
@@ -180,7 +173,7 @@ with st.container():
         # Select predicate
         st.write("##### Predicate")
         predicate = st.selectbox(
-            "Predicate", options=sorted(predicates_df.index), key=f"PREDICATE_{npred}"
+            "Predicate", options=schema.predicate_names, key=f"PREDICATE_{npred}"
         )
 
         # Select object
@@ -191,7 +184,7 @@ with st.container():
             object = st.text_input("Object name", key=f"ENTITY_{npred}")
 
             # Disambiguate entity
-            object_search_results = goldapi.entity_search(object)
+            object_search_results = entity_search(goldapi, object)
             try:
                 object_search_choices = (
                     object_search_results.get("data", {})
@@ -277,7 +270,9 @@ with st.container():
     if st.button("Submit Entity"):
         if statements:
             create_entity_input = CreateEntityInput(statements=statements)
-            data = goldapi.create_entity(create_entity_input=create_entity_input)
+            data = SubmissionEngine(jwt_token).call(
+                goldapi.create_entity, create_entity_input=create_entity_input
+            )
         else:
             data = None
 
@@ -5,11 +5,15 @@ from io import StringIO
 import pandas as pd
 import spacy_streamlit
 import streamlit as st
-from godel import GoldenAPI
 from godel.schema import CreateStatementInput
 from st_aggrid import AgGrid, DataReturnMode, GridOptionsBuilder, GridUpdateMode
 from st_aggrid.shared import AgGridTheme
 
+from api import golden_api
+from schema import get_schema
+from search import entity_search, search_stats
+from submit import SubmissionEngine
+
 st.set_page_config(layout="wide")
 
 st.markdown("# Create Triple")
@@ -51,29 +55,18 @@ jwt_token = st.text_input("JWT:", "")
 
 st.write("## Get Started")
 
-if jwt_token:
-    goldapi = GoldenAPI(jwt_token=jwt_token)
-else:
-    goldapi = GoldenAPI()
-
-# Retrieve predicate and template data
-predicates = {}
-predicates_inverse = {}
-for p in goldapi.predicates()["data"]["predicates"]["edges"]:
-    p = p["node"]
-    predicates[p["name"]] = {"id": p["id"], "objectType": p["objectType"]}
-    predicates_inverse[p["id"]] = {"name": p["name"], "objectType": p["objectType"]}
-predicates_df = pd.DataFrame(predicates).transpose()
-
-templates = {}
-for t in goldapi.templates()["data"]["templates"]["edges"]:
-    t = t["node"]
-    templates[t["entity"]["name"]] = {
-        "id": t["id"],
-        "entityId": t["entityId"],
-        "entityDescription": t["entity"]["description"],
-    }
-templates_df = pd.DataFrame(templates).transpose()
+with st.sidebar.expander("Entity search cache"):
+    st.json(search_stats())
+
+goldapi = golden_api(jwt_token)
+
+# Shared predicate and template data, refreshed in the background
+schema = get_schema()
+predicates = schema.predicates
+predicates_inverse = schema.predicates_inverse
+predicates_df = schema.predicates_df
+templates = schema.templates
+templates_df = schema.templates_df
 
 
 ############################
@@ -93,7 +86,7 @@ with st.container():
     # Get entity text options
     subject = st.text_input("Subject name")
     # Disambiguate entity
-    subject_search_results = goldapi.entity_search(subject)
+    subject_search_results = entity_search(goldapi, subject)
     try:
         subject_search_choices = (
             subject_search_results.get("data", {})
@@ -115,7 +108,7 @@ with st.container():
 
     # Select predicate
     st.write("#### Predicate")
-    predicate = st.selectbox("Predicate", options=sorted(predicates_df.index))
+    predicate = st.selectbox("Predicate", options=schema.predicate_names)
 
     # Select object
     st.write("#### Object")
@@ -125,7 +118,7 @@ with st.container():
         object = st.text_input("Object name")
 
         # Disambiguate entity
-        object_search_results = goldapi.entity_search(object)
+        object_search_results = entity_search(goldapi, object)
         try:
             object_search_choices = (
                 object_search_results.get("data", {})
@@ -185,8 +178,8 @@ with st.container():
                 object_entity_id=object_entity_disambiguation[1],
                 citation_urls=[citation] if citation else [],
             )
-            data = goldapi.create_statement(
-                create_statement_input=create_statement_input
+            data = SubmissionEngine(jwt_token).call(
+                goldapi.create_statement, create_statement_input=create_statement_input
             )
 
         # Case 2: Subject entity exists and object is value
@@ -197,8 +190,8 @@ with st.container():
                 object_value=object,
                 citation_urls=[citation] if citation else [],
             )
-            data = goldapi.create_statement(
-                create_statement_input=create_statement_input
+            data = SubmissionEngine(jwt_token).call(
+                goldapi.create_statement, create_statement_input=create_statement_input
             )
         else:
             data = None
@@ -5,22 +5,45 @@ import requests
 
 import pandas as pd
 import spacy
-import en_core_web_md
 import spacy_streamlit
 import streamlit as st
-from godel import GoldenAPI
 from godel.schema import CreateStatementInput
 from st_aggrid import AgGrid, DataReturnMode, GridOptionsBuilder, GridUpdateMode
 
+from api import golden_api
+from bulk_ner import DEFAULT_BATCH_SIZE as BULK_BATCH_SIZE, extract_entities, read_urls
 from helper import get_text_from_website
-
-nlp = en_core_web_md.load()
+from models import DEFAULT_TIER, TIERS, get_tier_nlp, model_stats
+from ner import analyze, ner_cache_stats
+from normalize import normalize_text
+from schema import get_schema
+from search import entity_choices, entity_search, entity_search_many, search_stats
+from submit import SubmissionEngine
+from suggest import get_predicate_index, ranked_names, span_context
 
 st.set_page_config(layout="wide")
 
 st.markdown("# Text to Triples")
 st.sidebar.markdown("# Text to Triples")
 
+# Loaded once per process and shared across sessions and reruns
+tier = st.sidebar.selectbox(
+    "NER model",
+    list(TIERS),
+    index=list(TIERS).index(DEFAULT_TIER),
+    help="rules: known organizations only, fast: en_core_web_sm, md: en_core_web_md",
+)
+try:
+    nlp = get_tier_nlp(tier)
+except OSError as e:
+    st.sidebar.error(f"Could not load the {tier} model, using {DEFAULT_TIER}: {e}")
+    tier = DEFAULT_TIER
+    nlp = get_tier_nlp(tier)
+
+with st.sidebar.expander("Model stats"):
+    st.json(model_stats())
+    st.json(ner_cache_stats())
+
 
 ########################
 ##### Introduction #####
@@ -82,29 +105,18 @@ jwt_token = st.text_input("JWT:", "")
 
 st.write("## Get Started")
 
-if jwt_token:
-    goldapi = GoldenAPI(jwt_token=jwt_token)
-else:
-    goldapi = GoldenAPI()
-
-# Retrieve predicate and template data
-predicates = {}
-predicates_inverse = {}
-for p in goldapi.predicates()["data"]["predicates"]["edges"]:
-    p = p["node"]
-    predicates[p["name"]] = {"id": p["id"], "objectType": p["objectType"]}
-    predicates_inverse[p["id"]] = {"name": p["name"], "objectType": p["objectType"]}
-predicates_df = pd.DataFrame(predicates).transpose()
-
-templates = {}
-for t in goldapi.templates()["data"]["templates"]["edges"]:
-    t = t["node"]
-    templates[t["entity"]["name"]] = {
-        "id": t["id"],
-        "entityId": t["entityId"],
-        "entityDescription": t["entity"]["description"],
-    }
-templates_df = pd.DataFrame(templates).transpose()
+with st.sidebar.expander("Entity search cache"):
+    st.json(search_stats())
+
+goldapi = golden_api(jwt_token)
+
+# Shared predicate and template data, refreshed in the background
+schema = get_schema()
+predicates = schema.predicates
+predicates_inverse = schema.predicates_inverse
+predicates_df = schema.predicates_df
+templates = schema.templates
+templates_df = schema.templates_df
 
 
 #########################
@@ -115,12 +127,11 @@ st.write("### 1. Enter a website to extract entities and potential relationships
 url = st.text_input("")
 
 meta, content = get_text_from_website(url)
-all_text = meta + content
-
-doc = nlp(all_text)
+# Sentence split, deduplicated and capped before NER
+all_text = normalize_text(meta, content)
 
-for ent in doc.ents:
-    print(ent.text, ent.start_char, ent.end_char, ent.label_)
+# Only runs the model for text it hasn't seen before
+doc = analyze(nlp, all_text)
 
 labels = set([ent.label_ for ent in doc.ents])
 if labels:
@@ -140,24 +151,19 @@ with st.container():
     st.write("#### Subject")
 
     # Get entity text options
-    subject_entity_choices = list(
-        filter(lambda x: x.label_ == "ORG" or x.label_ == "PERSON", doc.ents)
+    subject_entity_choices = sorted(
+        set(ent.text for ent in doc.ents if ent.label_ in ("ORG", "PERSON"))
     )
-    subject_entity_choices = set([span.text for span in subject_entity_choices])
+
+    # Link every candidate up front, in batched searches, so switching
+    # subjects doesn't cost a round trip
+    with st.spinner("Linking entities"):
+        linked_entities = entity_search_many(goldapi, subject_entity_choices)
     subject = st.selectbox("Subject", options=subject_entity_choices)
 
     # Disambiguate entity
-    subject_search_results = goldapi.entity_search(subject)
-    try:
-        subject_search_choices = (
-            subject_search_results.get("data", {})
-            .get("entityByName", {})
-            .get("nodes", [])
-        )
-    except:
-        subject_search_choices = []
+    subject_search_choices = entity_choices(linked_entities.get(subject))
     if subject_search_choices:
-        subject_search_choices = [(s["name"], s["id"]) for s in subject_search_choices]
         subject_entity_disambiguation = st.selectbox(
             "Subject Golden entity", options=subject_search_choices
         )
@@ -169,7 +175,21 @@ with st.container():
 
     # Select predicate
     st.write("#### Predicate")
-    predicate = st.selectbox("Predicate", options=sorted(predicates_df.index))
+    # Predicates closest to the words around the subject are listed first.
+    # Suggestions use the md word vectors whatever the NER tier.
+    subject_spans = [ent for ent in doc.ents if ent.text == subject]
+    predicate_options = schema.predicate_names
+    if subject_spans:
+        try:
+            predicate_index = get_predicate_index(schema)
+        except OSError as e:
+            st.warning(f"Predicate suggestions are unavailable: {e}")
+        else:
+            predicate_options = ranked_names(
+                predicate_options,
+                predicate_index.suggest(span_context(doc, subject_spans[0])),
+            )
+    predicate = st.selectbox("Predicate", options=predicate_options)
 
     # Select object
     st.write("#### Object")
@@ -179,7 +199,7 @@ with st.container():
         object = st.text_input("Object name")
 
         # Disambiguate entity
-        object_search_results = goldapi.entity_search(object)
+        object_search_results = entity_search(goldapi, object)
         try:
             object_search_choices = (
                 object_search_results.get("data", {})
@@ -239,8 +259,8 @@ with st.container():
                 object_entity_id=object_entity_disambiguation[1],
                 citation_urls=[citation] if citation else [],
             )
-            data = goldapi.create_statement(
-                create_statement_input=create_statement_input
+            data = SubmissionEngine(jwt_token).call(
+                goldapi.create_statement, create_statement_input=create_statement_input
             )
 
         # Case 2: Subject entity exists and object is value
@@ -251,8 +271,8 @@ with st.container():
                 object_value=object,
                 citation_urls=[citation] if citation else [],
             )
-            data = goldapi.create_statement(
-                create_statement_input=create_statement_input
+            data = SubmissionEngine(jwt_token).call(
+                goldapi.create_statement, create_statement_input=create_statement_input
             )
         else:
             data = None
@@ -265,3 +285,32 @@ with st.container():
             st.write("Invalid or no submission yet, check error message")
             st.write(f"Data message return:")
             data
+
+
+######################
+##### Batch Mode #####
+######################
+with st.expander("Batch mode: extract entities from many URLs"):
+    st.write(
+        "Entities for every URL are written as JSON lines. "
+        "For very large lists run `python streamlit/bulk_ner.py urls.txt -o entities.jsonl` instead."
+    )
+    batch_urls = read_urls(st.text_area("URLs, one per line").splitlines())
+    col1, col2 = st.columns(2)
+    batch_size = col1.number_input("Batch size", 1, 1024, BULK_BATCH_SIZE)
+    n_process = col2.number_input("Processes", 1, 16, 1)
+
+    if batch_urls and st.button("Extract entities"):
+        out = StringIO()
+        stats = extract_entities(
+            batch_urls,
+            out,
+            tier=tier,
+            batch_size=int(batch_size),
+            n_process=int(n_process),
+        )
+        (
+            f"Processed {stats['urls']} URLs in {stats['seconds']}s, "
+            f"{stats['failed']} could not be fetched"
+        )
+        st.download_button("Download JSONL", out.getvalue(), "entities.jsonl")
@@ -0,0 +1,133 @@
+import json
+import os
+import threading
+import time
+
+import pandas as pd
+
+from api import golden_api
+from cache import cache_path
+
+# Predicates and templates change rarely, so one copy is shared by every page
+# and session in the process. It is refreshed in the background once it is
+# older than SCHEMA_TTL and persisted to disk so a cold start can serve the
+# last snapshot instead of waiting on the API.
+
+SCHEMA_TTL = int(os.environ.get("DATA_APPS_SCHEMA_TTL", 60 * 60))
+SNAPSHOT_PATH = cache_path("schema.json")
+
+_schema = None
+_lock = threading.Lock()
+_refreshing = threading.Event()
+
+
+class Schema:
+    def __init__(self, predicate_nodes, template_nodes, fetched_at):
+        self.fetched_at = fetched_at
+
+        self.predicates = {}
+        self.predicates_inverse = {}
+        for p in predicate_nodes:
+            self.predicates[p["name"]] = {"id": p["id"], "objectType": p["objectType"]}
+            self.predicates_inverse[p["id"]] = {
+                "name": p["name"],
+                "objectType": p["objectType"],
+            }
+
+        self.templates = {}
+        for t in template_nodes:
+            self.templates[t["entity"]["name"]] = {
+                "id": t["id"],
+                "entityId": t["entityId"],
+                "entityDescription": t["entity"]["description"],
+            }
+
+        self.predicates_df = pd.DataFrame(self.predicates).transpose()
+        self.templates_df = pd.DataFrame(self.templates).transpose()
+        self.predicate_names = sorted(self.predicates)
+        self.template_names = sorted(self.templates)
+
+        self._predicate_nodes = predicate_nodes
+        self._template_nodes = template_nodes
+
+    def age(self):
+        return time.time() - self.fetched_at
+
+    def to_snapshot(self):
+        return {
+            "fetched_at": self.fetched_at,
+            "predicates": self._predicate_nodes,
+            "templates": self._template_nodes,
+        }
+
+
+def fetch_schema(goldapi=None):
+    goldapi = goldapi or golden_api()
+    predicate_nodes = [
+        e["node"] for e in goldapi.predicates()["data"]["predicates"]["edges"]
+    ]
+    template_nodes = [
+        e["node"] for e in goldapi.templates()["data"]["templates"]["edges"]
+    ]
+    return Schema(predicate_nodes, template_nodes, time.time())
+
+
+def load_snapshot(path=SNAPSHOT_PATH):
+    try:
+        with open(path) as f:
+            snapshot = json.load(f)
+        return Schema(
+            snapshot["predicates"], snapshot["templates"], snapshot["fetched_at"]
+        )
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+def save_snapshot(schema, path=SNAPSHOT_PATH):
+    # Write then rename so readers never see a half written snapshot
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(schema.to_snapshot(), f)
+    os.replace(tmp_path, path)
+
+
+def _set_schema(schema):
+    global _schema
+    _schema = schema
+    try:
+        save_snapshot(schema)
+    except OSError as e:
+        print(f"SCHEMA SNAPSHOT FAILURE: {e}")
+
+
+def _refresh():
+    try:
+        _set_schema(fetch_schema())
+    except Exception as e:
+        # Keep serving the previous schema, the next call will try again
+        print(f"SCHEMA REFRESH FAILURE: {e}")
+    finally:
+        _refreshing.clear()
+
+
+def refresh_in_background():
+    with _lock:
+        if _refreshing.is_set():
+            return
+        _refreshing.set()
+    threading.Thread(target=_refresh, name="schema-refresh", daemon=True).start()
+
+
+def get_schema(ttl=SCHEMA_TTL):
+    global _schema
+    if _schema is None:
+        with _lock:
+            if _schema is None:
+                snapshot = load_snapshot()
+                if snapshot is not None:
+                    _schema = snapshot
+                else:
+                    _set_schema(fetch_schema())
+    if _schema.age() > ttl:
+        refresh_in_background()
+    return _schema
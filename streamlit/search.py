@@ -0,0 +1,159 @@
+import threading
+from concurrent.futures import Future
+from itertools import islice
+
+from cache import TTLCache
+
+# Memoized entity search shared by every page and session.
+# Streamlit reruns re-issue the same searches on every widget change, so
+# results are cached by normalized query, queries too short to be useful are
+# skipped, and identical searches already in flight wait on the first call
+# instead of issuing their own. entity_search_many resolves many names with
+# one aliased GraphQL document per batch, sharing the same cache.
+
+MIN_QUERY_LENGTH = 2
+DEFAULT_SEARCH_BATCH_SIZE = 50
+SEARCH_FIELDS = "nodes { id name }"
+
+_cache = TTLCache(maxsize=4096, ttl=10 * 60)
+_inflight = {}
+_lock = threading.Lock()
+_counters = {"skipped": 0, "coalesced": 0, "errors": 0}
+
+
+def normalize_query(query):
+    if not isinstance(query, str):
+        return ""
+    return " ".join(query.split()).casefold()
+
+
+def _count(counter):
+    with _lock:
+        _counters[counter] += 1
+
+
+def entity_search(goldapi, query):
+    key = normalize_query(query)
+    if len(key) < MIN_QUERY_LENGTH:
+        _count("skipped")
+        return {}
+
+    result = _cache.get(key)
+    if result is not TTLCache.MISSING:
+        return result
+
+    with _lock:
+        future = _inflight.get(key)
+        owner = future is None
+        if owner:
+            future = Future()
+            _inflight[key] = future
+        else:
+            _counters["coalesced"] += 1
+
+    if not owner:
+        return future.result()
+
+    try:
+        result = goldapi.entity_search(query.strip())
+    except Exception as e:
+        with _lock:
+            _counters["errors"] += 1
+            _inflight.pop(key, None)
+        future.set_exception(e)
+        raise
+
+    # Only successful responses are worth remembering
+    if isinstance(result, dict) and not result.get("errors"):
+        _cache.set(key, result)
+    with _lock:
+        _inflight.pop(key, None)
+    future.set_result(result)
+    return result
+
+
+def entity_search_document(count):
+    variables = ", ".join(f"$name{i}: String!" for i in range(count))
+    fields = "\n".join(
+        f"  q{i}: entityByName(name: $name{i}) {{ {SEARCH_FIELDS} }}"
+        for i in range(count)
+    )
+    return f"query EntitySearches({variables}) {{\n{fields}\n}}"
+
+
+def _split_search_response(response, count):
+    data = (response or {}).get("data") or {}
+    errors = (response or {}).get("errors") or []
+    results = [{"data": {"entityByName": data.get(f"q{i}")}} for i in range(count)]
+    for error in errors:
+        path = error.get("path") or []
+        alias = path[0] if path else None
+        if isinstance(alias, str) and alias[1:].isdigit() and int(alias[1:]) < count:
+            results[int(alias[1:])].setdefault("errors", []).append(error)
+        else:
+            for result in results:
+                result.setdefault("errors", []).append(error)
+    return results
+
+
+def entity_search_many(
+    goldapi, queries, batch_size=DEFAULT_SEARCH_BATCH_SIZE, engine=None
+):
+    # Returns {query: result} with results shaped like entity_search's.
+    # Cached names cost nothing, the rest take one request per batch. With a
+    # SubmissionEngine the requests are rate limited and retried.
+    results = {}
+    misses = {}
+    for query in queries:
+        key = normalize_query(query)
+        if len(key) < MIN_QUERY_LENGTH:
+            _count("skipped")
+            results[query] = {}
+            continue
+        result = _cache.get(key)
+        if result is not TTLCache.MISSING:
+            results[query] = result
+        else:
+            misses.setdefault(key, []).append(query)
+
+    keys = iter(misses)
+    while True:
+        batch = list(islice(keys, batch_size))
+        if not batch:
+            break
+        variables = {
+            f"name{i}": misses[key][0].strip() for i, key in enumerate(batch)
+        }
+        try:
+            document = entity_search_document(len(batch))
+            if engine:
+                response = engine.call(goldapi.query, document, variables)
+            else:
+                response = goldapi.query(document, variables)
+        except Exception:
+            _count("errors")
+            raise
+        for key, result in zip(batch, _split_search_response(response, len(batch))):
+            if result.get("errors"):
+                _count("errors")
+            else:
+                _cache.set(key, result)
+            for query in misses[key]:
+                results[query] = result
+    return results
+
+
+def entity_choices(result):
+    # (name, id) options from an entity search result
+    try:
+        nodes = result.get("data", {}).get("entityByName", {}).get("nodes", [])
+        return [(node["name"], node["id"]) for node in nodes]
+    except (AttributeError, KeyError, TypeError):
+        return []
+
+
+def search_stats():
+    with _lock:
+        stats = dict(_counters)
+    stats.update(_cache.stats())
+    return stats
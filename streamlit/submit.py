@@ -0,0 +1,356 @@
+import random
+import re
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from itertools import islice
+from urllib.error import HTTPError, URLError
+
+# Bulk submission helpers for the GraphQL API.
+# Rows are packed into a single mutation document where each createEntity
+# call gets its own alias and variable, so one HTTP round trip creates a whole
+# batch. Responses are split back into one result per row shaped like the
+# response of goldapi.create_entity, so callers can treat both the same way.
+# SubmissionEngine runs these calls from a bounded thread pool behind a token
+# bucket per JWT, retrying 429/5xx responses with exponential backoff.
+
+DEFAULT_BATCH_SIZE = 50
+DEFAULT_CONCURRENCY = 4
+DEFAULT_RATE = 5  # requests per second per JWT
+DEFAULT_MAX_RETRIES = 5
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+CREATE_ENTITY_FIELDS = "entity { id name }"
+# Variable coercion errors name the offending variable in their message
+INPUT_VARIABLE_RE = re.compile(r"\$input(\d+)\b")
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def create_entity_document(count):
+    variables = ", ".join(f"$input{i}: CreateEntityInput!" for i in range(count))
+    fields = "\n".join(
+        f"  e{i}: createEntity(input: $input{i}) {{ {CREATE_ENTITY_FIELDS} }}"
+        for i in range(count)
+    )
+    return f"mutation CreateEntities({variables}) {{\n{fields}\n}}"
+
+
+def split_batch_response(response, count):
+    data = (response or {}).get("data") or {}
+    errors = (response or {}).get("errors") or []
+
+    row_errors = [[] for _ in range(count)]
+    for error in errors:
+        path = error.get("path") or []
+        alias = path[0] if path else None
+        if isinstance(alias, str) and alias[1:].isdigit() and int(alias[1:]) < count:
+            row_errors[int(alias[1:])].append(error)
+        else:
+            # Document level failures (validation, auth, transport) hit every row
+            for e in row_errors:
+                e.append(error)
+
+    results = []
+    for i in range(count):
+        result = {"data": {"createEntity": data.get(f"e{i}")}}
+        if row_errors[i]:
+            result["errors"] = row_errors[i]
+        results.append(result)
+    return results
+
+
+def _query_batch(goldapi, create_entity_inputs, engine=None):
+    document = create_entity_document(len(create_entity_inputs))
+    variables = {
+        f"input{i}": create_entity_input.__to_json_value__()
+        for i, create_entity_input in enumerate(create_entity_inputs)
+    }
+    if engine:
+        return engine.call(goldapi.query, document, variables)
+    return goldapi.query(document, variables)
+
+
+def _rejected_document_errors(response, count):
+    # Errors without a path (validation, variable coercion) that rejected the
+    # whole document, so no row was created. Transport failures carry an HTTP
+    # status and really do hit every row, and once any alias has data the
+    # document ran, so neither is worth narrowing down.
+    response = response or {}
+    errors = [e for e in response.get("errors") or [] if not e.get("path")]
+    if not errors or any(e.get("status") for e in errors):
+        return []
+    data = response.get("data") or {}
+    if any(data.get(f"e{i}") is not None for i in range(count)):
+        return []
+    return errors
+
+
+def _error_messages(errors):
+    return sorted(e.get("message") or "" for e in errors)
+
+
+def _narrow_batch(goldapi, create_entity_inputs, engine, response):
+    count = len(create_entity_inputs)
+    errors = _rejected_document_errors(response, count)
+    if count == 1 or not errors:
+        return split_batch_response(response, count)
+
+    bad_rows = {}
+    for error in errors:
+        for i in INPUT_VARIABLE_RE.findall(error.get("message") or ""):
+            if int(i) < count:
+                bad_rows.setdefault(int(i), []).append(error)
+    if bad_rows:
+        results = [None] * count
+        for i, row_errors in bad_rows.items():
+            results[i] = {"data": {"createEntity": None}, "errors": row_errors}
+        rest = [i for i in range(count) if i not in bad_rows]
+        rest_results = submit_create_entity_batch(
+            goldapi, [create_entity_inputs[i] for i in rest], engine
+        )
+        for i, result in zip(rest, rest_results):
+            results[i] = result
+        return results
+
+    # No row named, bisect until the failing rows are on their own. When both
+    # halves are rejected with the same message the error doesn't depend on
+    # the rows (auth, schema), so every row gets it without splitting further.
+    middle = count // 2
+    halves = [create_entity_inputs[:middle], create_entity_inputs[middle:]]
+    responses = [_query_batch(goldapi, half, engine) for half in halves]
+    half_errors = [
+        _rejected_document_errors(r, len(half)) for r, half in zip(responses, halves)
+    ]
+    if all(half_errors) and _error_messages(half_errors[0]) == _error_messages(
+        half_errors[1]
+    ):
+        return split_batch_response(response, count)
+    return [
+        result
+        for half, half_response in zip(halves, responses)
+        for result in _narrow_batch(goldapi, half, engine, half_response)
+    ]
+
+
+def submit_create_entity_batch(goldapi, create_entity_inputs, engine=None):
+    count = len(create_entity_inputs)
+    if not count:
+        return []
+    response = _query_batch(goldapi, create_entity_inputs, engine)
+    return _narrow_batch(goldapi, create_entity_inputs, engine, response)
+
+
+def created_entity(result):
+    try:
+        return result["data"]["createEntity"]["entity"]
+    except (KeyError, TypeError):
+        return None
+
+
+def result_errors(result):
+    if isinstance(result, Exception):
+        return [str(result)]
+    return [e.get("message") for e in (result or {}).get("errors") or []]
+
+
+class TokenBucket:
+    def __init__(self, rate, burst=None):
+        self.burst = burst
+        self.rate = float(rate)
+        self.capacity = float(burst or max(1, rate))
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(
+            self.capacity, self.tokens + (now - self.updated_at) * self.rate
+        )
+        self.updated_at = now
+
+    def set_rate(self, rate):
+        # Tokens already earned are kept, up to the new capacity
+        with self.lock:
+            self._refill()
+            self.rate = float(rate)
+            self.capacity = float(self.burst or max(1, rate))
+            self.tokens = min(self.tokens, self.capacity)
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+# One bucket per JWT, shared by every session submitting with that token.
+# The most recently requested rate applies to all of them.
+_buckets = {}
+_buckets_lock = threading.Lock()
+
+
+def bucket_for(jwt_token, rate=DEFAULT_RATE):
+    with _buckets_lock:
+        bucket = _buckets.get(jwt_token)
+        if bucket is None:
+            bucket = _buckets[jwt_token] = TokenBucket(rate)
+        elif bucket.rate != rate:
+            bucket.set_rate(rate)
+        return bucket
+
+
+def connect_failed(e):
+    # True when the request can't have reached the server, so sending it
+    # again can't create anything twice. urllib raises URLError while
+    # connecting and sending; timeouts and resets while waiting for the
+    # response come through as they are and are not retried.
+    if isinstance(e, HTTPError):
+        return False
+    if isinstance(e, URLError):
+        return True
+    return isinstance(e, (ConnectionRefusedError, socket.gaierror))
+
+
+def _retry_after_header(headers):
+    try:
+        return float((headers or {}).get("Retry-After") or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def retry_after(response):
+    # The GraphQL client reports HTTP failures as errors carrying the status,
+    # and other failures as errors carrying the exception
+    for error in (response or {}).get("errors") or []:
+        if error.get("status") in RETRY_STATUSES:
+            return _retry_after_header(error.get("headers"))
+        exception = error.get("exception")
+        if isinstance(exception, OSError) and connect_failed(exception):
+            return 0.0
+    return None
+
+
+class SubmissionEngine:
+    def __init__(
+        self,
+        jwt_token="",
+        concurrency=DEFAULT_CONCURRENCY,
+        rate=DEFAULT_RATE,
+        max_retries=DEFAULT_MAX_RETRIES,
+        backoff=0.5,
+        max_backoff=30.0,
+    ):
+        self.concurrency = concurrency
+        self.bucket = bucket_for(jwt_token, rate)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.retries = 0
+        self._lock = threading.Lock()
+
+    def _retry(self, attempt, minimum=0.0):
+        with self._lock:
+            self.retries += 1
+        # Exponential backoff with full jitter
+        delay = min(self.max_backoff, self.backoff * 2 ** attempt)
+        time.sleep(max(minimum, random.uniform(0, delay)))
+
+    def call(self, fn, *args, **kwargs):
+        # Rate limited call of fn, retried on 429/5xx and on failures to
+        # connect. Anything that may have reached the server is not retried,
+        # fn can create entities and statements.
+        for attempt in range(self.max_retries + 1):
+            last_attempt = attempt == self.max_retries
+            self.bucket.acquire()
+            try:
+                response = fn(*args, **kwargs)
+            except HTTPError as e:
+                if last_attempt or e.code not in RETRY_STATUSES:
+                    raise
+                self._retry(attempt, minimum=_retry_after_header(e.headers))
+                continue
+            except OSError as e:
+                if last_attempt or not connect_failed(e):
+                    raise
+                self._retry(attempt)
+                continue
+            wait = retry_after(response)
+            if wait is None or last_attempt:
+                return response
+            self._retry(attempt, minimum=wait)
+
+    def map(self, fn, items, on_progress=None, weights=None, on_result=None):
+        # Run fn over items with bounded concurrency, keeping the order of
+        # items. on_progress(done, total) and on_result(index, result) run on
+        # the calling thread as items complete, so they can safely update
+        # Streamlit elements; weights lets progress count rows instead of items.
+        weights = weights or [1] * len(items)
+        total = sum(weights)
+        done = 0
+        results = [None] * len(items)
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            futures = {executor.submit(fn, item): i for i, item in enumerate(items)}
+            for future in as_completed(futures):
+                i = futures[future]
+                try:
+                    results[i] = future.result()
+                except Exception as e:
+                    results[i] = e
+                if on_result:
+                    on_result(i, results[i])
+                done += weights[i]
+                if on_progress:
+                    on_progress(done, total)
+        return results
+
+
+def submit_create_entities(
+    goldapi,
+    engine,
+    create_entity_inputs,
+    batch_size=DEFAULT_BATCH_SIZE,
+    on_progress=None,
+    on_result=None,
+):
+    # on_result(index, result) is called per input as its batch completes
+    batches = list(batched(create_entity_inputs, batch_size))
+    sizes = [len(batch) for batch in batches]
+    offsets = [0]
+    for size in sizes[:-1]:
+        offsets.append(offsets[-1] + size)
+    results = [None] * len(create_entity_inputs)
+
+    def on_batch_result(b, batch_result):
+        if isinstance(batch_result, Exception):
+            # The whole batch failed before a response came back
+            batch_result = split_batch_response(
+                {"errors": [{"message": str(batch_result)}]}, sizes[b]
+            )
+        for j, result in enumerate(batch_result):
+            results[offsets[b] + j] = result
+            if on_result:
+                on_result(offsets[b] + j, result)
+
+    engine.map(
+        lambda batch: submit_create_entity_batch(goldapi, batch, engine=engine),
+        batches,
+        on_progress=on_progress,
+        weights=sizes,
+        on_result=on_batch_result,
+    )
+    return results
@@ -0,0 +1,81 @@
+import re
+import threading
+
+import numpy as np
+
+from models import get_nlp
+
+# Predicate suggestions by word vector similarity.
+# Every predicate name is embedded once per schema with the word vectors of
+# the md model into a row normalized matrix, so a suggestion is a tokenizer
+# call, one matrix-vector product and a partial sort. Only the tokenizer and
+# the vocab are used, none of the pipeline components run.
+
+DEFAULT_K = 5
+
+CAMEL_CASE_RE = re.compile(r"(?<=[a-z0-9])(?=[A-Z])")
+SEPARATOR_RE = re.compile(r"[_\-./]+")
+
+_indexes = {}
+_lock = threading.Lock()
+
+
+def split_identifier(text):
+    # "founded_date", "foundedDate" and "Founded date" embed the same
+    return SEPARATOR_RE.sub(" ", CAMEL_CASE_RE.sub(" ", text or ""))
+
+
+class PredicateIndex:
+    def __init__(self, names, nlp):
+        self.names = list(names)
+        self.nlp = nlp
+        vectors = np.zeros((len(self.names), nlp.vocab.vectors_length), dtype="f4")
+        for i, name in enumerate(self.names):
+            vectors[i] = self._embed(name)
+        self.matrix = vectors
+
+    def _embed(self, text):
+        vector = self.nlp.make_doc(split_identifier(text)).vector
+        norm = np.linalg.norm(vector)
+        # Text without known words gets a zero vector, which matches nothing
+        return vector / norm if norm else vector
+
+    def suggest(self, text, k=DEFAULT_K):
+        # Returns up to k (name, cosine similarity) pairs, best first
+        query = self._embed(text)
+        if not self.names or not query.any():
+            return []
+        scores = self.matrix @ query
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(self.names[i], float(scores[i])) for i in top if scores[i] > 0]
+
+
+def get_predicate_index(schema, nlp=None):
+    # One index per schema snapshot, rebuilt when the schema is refreshed
+    nlp = nlp or get_nlp()
+    key = (schema.fetched_at, nlp.meta.get("name"), nlp.meta.get("version"))
+    index = _indexes.get(key)
+    if index is None:
+        with _lock:
+            index = _indexes.get(key)
+            if index is None:
+                index = PredicateIndex(schema.predicate_names, nlp)
+                _indexes.clear()
+                _indexes[key] = index
+    return index
+
+
+def span_context(doc, span, window=10):
+    # Words around an entity span, without the span itself
+    before = doc[max(0, span.start - window) : span.start].text
+    after = doc[span.end : span.end + window].text
+    return f"{before} {after}"
+
+
+def ranked_names(names, suggestions):
+    # Suggested names first, then the rest in their original order
+    suggested = [name for name, _ in suggestions]
+    chosen = set(suggested)
+    return suggested + [name for name in names if name not in chosen]
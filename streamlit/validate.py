@@ -0,0 +1,121 @@
+import numpy as np
+import pandas as pd
+
+from ingest import DELIMITER
+
+# Whole-column validation of mapped values against predicate object types.
+# Cells are split into values the same way build_statement_table splits them,
+# every value of a column is checked with one vectorized string or date
+# operation, and the result is folded back into a per-cell error mask, so
+# rows that would be rejected by the API are dropped before submission.
+
+# Formats accepted for DATE values, with the exact shape each must have.
+# pandas' ISO 8601 fast path accepts times and offsets after a date whatever
+# the format, so the shape is checked first.
+DATE_FORMATS = {
+    "%Y-%m-%d": r"\d{4}-\d{2}-\d{2}",
+    "%Y-%m": r"\d{4}-\d{2}",
+    "%Y": r"\d{4}",
+    "%d-%m-%Y": r"\d{2}-\d{2}-\d{4}",
+}
+URI_PATTERN = r"[A-Za-z][A-Za-z0-9+.\-]*:\S+"
+HTTP_URL_PATTERN = r"(?i:https?)://[^\s/?#]+\S*"
+UUID_PATTERN = r"[0-9A-Fa-f]{8}-(?:[0-9A-Fa-f]{4}-){3}[0-9A-Fa-f]{12}"
+
+ERROR_MESSAGES = {
+    "DATE": "expected a date, e.g. 2020-01-31",
+    "ANY_URI": "expected a URI, e.g. https://example.com",
+    "ENTITY": "expected an entity id",
+    "STRING": "expected text",
+}
+MISSING_SUBJECT = "missing subject"
+
+
+def valid_dates(values):
+    valid = np.zeros(len(values), dtype=bool)
+    for date_format, pattern in DATE_FORMATS.items():
+        shaped = values.str.fullmatch(pattern).to_numpy(dtype=bool)
+        if shaped.any():
+            # Parsing still rejects impossible dates such as 2020-02-30
+            parsed = pd.to_datetime(
+                values[shaped], format=date_format, errors="coerce"
+            )
+            valid[shaped] |= parsed.notna().to_numpy()
+    return valid
+
+
+def valid_uris(values):
+    is_uri = values.str.fullmatch(URI_PATTERN)
+    # http(s) URIs also need a host
+    is_http = values.str.match(r"(?i:https?):")
+    is_url = values.str.fullmatch(HTTP_URL_PATTERN)
+    return (is_uri & (~is_http | is_url)).to_numpy(dtype=bool)
+
+
+def valid_entity_ids(values):
+    return values.str.fullmatch(UUID_PATTERN).to_numpy(dtype=bool)
+
+
+def valid_strings(values):
+    return (values.str.strip().str.len() > 0).to_numpy()
+
+
+VALIDATORS = {
+    "DATE": valid_dates,
+    "ANY_URI": valid_uris,
+    "ENTITY": valid_entity_ids,
+    "STRING": valid_strings,
+}
+
+
+def invalid_cells(column, object_type):
+    # Boolean Series over the column's index, True where any value of the
+    # cell fails validation. Empty cells hold no statement, so they pass.
+    validator = VALIDATORS.get(object_type)
+    invalid = pd.Series(False, index=column.index)
+    if validator is None:
+        return invalid
+    values = column.dropna().astype(str).str.split(DELIMITER).explode()
+    values = values[values.str.len() > 0]
+    if not len(values):
+        return invalid
+    failed = values.index[~validator(values)]
+    invalid.loc[failed.unique()] = True
+    return invalid
+
+
+def validate(df, subject_col, triple_col_map, predicates):
+    # Returns a boolean error mask with the subject and mapped columns of df
+    mask = pd.DataFrame(index=df.index)
+    mask[subject_col] = df[subject_col].isna().to_numpy() | (
+        df[subject_col].astype(str).str.strip().str.len() == 0
+    ).to_numpy()
+    for col, predicate in triple_col_map.items():
+        mask[col] = invalid_cells(df[col], predicates[predicate]["objectType"])
+    return mask
+
+
+def error_messages(mask, triple_col_map, predicates):
+    # One "column: reason" summary per invalid row
+    reasons = {}
+    for col in mask.columns:
+        if col in triple_col_map:
+            object_type = predicates[triple_col_map[col]]["objectType"]
+            reasons[col] = f"{col}: {ERROR_MESSAGES.get(object_type, 'invalid')}"
+        else:
+            reasons[col] = f"{col}: {MISSING_SUBJECT}"
+    invalid = mask[mask.any(axis=1)]
+    return invalid.apply(
+        lambda row: "; ".join(reasons[col] for col in row.index[row.to_numpy()]),
+        axis=1,
+    )
+
+
+def highlight_errors(df, mask, color="#ffcdd2"):
+    # Styler with the invalid cells of df highlighted
+    styles = np.where(
+        mask.reindex(index=df.index, columns=df.columns, fill_value=False),
+        f"background-color: {color}",
+        "",
+    )
+    return df.style.apply(lambda _: styles, axis=None)
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The apps import their modules relative to the streamlit directory
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "streamlit"))
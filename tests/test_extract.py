@@ -0,0 +1,42 @@
+import signal
+import time
+
+import pytest
+
+pytest.importorskip("boilerpy3")
+pytest.importorskip("extruct")
+
+import extract  # noqa: E402
+import helper  # noqa: E402
+
+pytestmark = pytest.mark.skipif(
+    not hasattr(signal, "setitimer"), reason="needs SIGALRM"
+)
+
+
+class SlowExtractor:
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def extract_items(self, tree, base_url=None):
+        time.sleep(5)
+        return []
+
+
+def test_time_budget_stops_slow_extractor(monkeypatch):
+    boiled = []
+    monkeypatch.setattr("extruct._extruct.OpenGraphExtractor", SlowExtractor)
+    monkeypatch.setattr(helper, "boil_html", lambda html_doc: boiled.append(1))
+
+    start = time.perf_counter()
+    result = extract._extract(
+        "<html><body><p>text</p></body></html>",
+        "https://example.com/",
+        0.2,
+        ("opengraph",),
+    )
+
+    assert result == extract.EMPTY_TEXT
+    assert time.perf_counter() - start < 2
+    # The timeout is not swallowed by extruct's error handling
+    assert boiled == []
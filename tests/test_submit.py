@@ -0,0 +1,264 @@
+import json
+import socket
+import threading
+import urllib.request
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.error import URLError
+
+import pytest
+
+import submit
+from submit import split_batch_response, submit_create_entity_batch
+
+
+class Input:
+    def __init__(self, name):
+        self.name = name
+
+    def __to_json_value__(self):
+        return {"name": self.name}
+
+
+class StubAPI:
+    # Stand-in for GoldenAPI.query that rejects the whole document when any
+    # input is named "bad", the way GraphQL variable coercion does
+    def __init__(self, name_variable=True):
+        self.name_variable = name_variable
+        self.queries = []
+
+    def query(self, document, variables):
+        self.queries.append(variables)
+        names = {k: v["name"] for k, v in variables.items()}
+        bad = [k for k, name in names.items() if name == "bad"]
+        if bad:
+            if self.name_variable:
+                message = f'Variable "${bad[0]}" got invalid value'
+            else:
+                message = "Invalid input"
+            return {"data": None, "errors": [{"message": message}]}
+        return {
+            "data": {
+                f"e{k[5:]}": {"entity": {"id": name, "name": name}}
+                for k, name in names.items()
+            }
+        }
+
+
+def test_split_batch_response_assigns_path_errors_to_rows():
+    response = {
+        "data": {"e0": {"entity": {"id": "a"}}, "e1": None},
+        "errors": [{"message": "duplicate", "path": ["e1"]}],
+    }
+    results = split_batch_response(response, 2)
+    assert results[0] == {"data": {"createEntity": {"entity": {"id": "a"}}}}
+    assert results[1]["errors"] == [{"message": "duplicate", "path": ["e1"]}]
+
+
+def test_split_batch_response_copies_document_errors():
+    results = split_batch_response({"errors": [{"message": "unauthorized"}]}, 3)
+    assert all(r["errors"] == [{"message": "unauthorized"}] for r in results)
+
+
+def created_names(results):
+    return [
+        (r["data"]["createEntity"] or {}).get("entity", {}).get("name")
+        for r in results
+    ]
+
+
+def test_named_variable_error_only_fails_that_row():
+    goldapi = StubAPI()
+    inputs = [Input(name) for name in ["a", "b", "bad", "c"]]
+    results = submit_create_entity_batch(goldapi, inputs)
+    assert created_names(results) == ["a", "b", None, "c"]
+    assert "$input2" in results[2]["errors"][0]["message"]
+    assert len(goldapi.queries) == 2
+
+
+def test_unnamed_document_error_is_bisected():
+    goldapi = StubAPI(name_variable=False)
+    inputs = [Input(name) for name in ["a", "b", "c", "bad", "d"]]
+    results = submit_create_entity_batch(goldapi, inputs)
+    assert created_names(results) == ["a", "b", "c", None, "d"]
+    assert results[3]["errors"] == [{"message": "Invalid input"}]
+
+
+def test_partial_data_is_not_resubmitted():
+    class PartlyCreated:
+        queries = 0
+
+        def query(self, document, variables):
+            self.queries += 1
+            return {
+                "data": {"e0": {"entity": {"id": "1", "name": "a"}}, "e1": None},
+                "errors": [{"message": "Internal error"}],
+            }
+
+    goldapi = PartlyCreated()
+    results = submit_create_entity_batch(goldapi, [Input("a"), Input("b")])
+    assert goldapi.queries == 1
+    assert created_names(results) == ["a", None]
+    assert results[1]["errors"] == [{"message": "Internal error"}]
+
+
+def test_error_on_every_row_stops_bisecting():
+    class Unauthorized:
+        queries = 0
+
+        def query(self, document, variables):
+            self.queries += 1
+            return {"data": None, "errors": [{"message": "Unauthorized"}]}
+
+    goldapi = Unauthorized()
+    results = submit_create_entity_batch(goldapi, [Input(str(i)) for i in range(50)])
+    # The whole batch, then each half once
+    assert goldapi.queries == 3
+    assert all(r["errors"] == [{"message": "Unauthorized"}] for r in results)
+
+
+def test_transport_errors_are_not_bisected():
+    class Unavailable:
+        queries = 0
+
+        def query(self, document, variables):
+            self.queries += 1
+            return {"errors": [{"message": "Service Unavailable", "status": 503}]}
+
+    goldapi = Unavailable()
+    results = submit_create_entity_batch(goldapi, [Input("a"), Input("b")])
+    assert goldapi.queries == 1
+    assert all(r["errors"][0]["status"] == 503 for r in results)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        # Real sleeps overshoot, which keeps float rounding in the bucket
+        # from asking for ever smaller waits
+        self.sleeps.append(seconds)
+        self.now += seconds + 1e-9
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(submit.time, "monotonic", clock.monotonic)
+    monkeypatch.setattr(submit.time, "sleep", clock.sleep)
+    return clock
+
+
+def test_token_bucket_limits_rate(clock):
+    bucket = submit.TokenBucket(rate=5)
+    for _ in range(15):
+        bucket.acquire()
+    # The first 5 are the burst, the next 10 come at 5 per second
+    assert clock.now == pytest.approx(2.0)
+
+
+def test_bucket_for_keeps_one_bucket_per_jwt(clock):
+    bucket = submit.bucket_for("jwt-rate-change", rate=5)
+    for _ in range(5):
+        bucket.acquire()
+    assert submit.bucket_for("jwt-rate-change", rate=10) is bucket
+    assert bucket.rate == 10
+    # Spent tokens are not handed back by the rate change
+    bucket.acquire()
+    assert clock.now == pytest.approx(0.1)
+
+
+def engine(jwt):
+    return submit.SubmissionEngine(jwt, rate=1000, max_retries=3)
+
+
+def test_call_waits_for_retry_after(clock):
+    responses = [
+        {"errors": [{"status": 429, "headers": {"Retry-After": "7"}}]},
+        {"data": {"ok": True}},
+    ]
+    e = engine("jwt-retry-after")
+    assert e.call(responses.pop, 0) == {"data": {"ok": True}}
+    assert e.retries == 1
+    assert max(clock.sleeps) >= 7
+
+
+def test_call_retries_connect_failures_only(clock):
+    attempts = []
+
+    def refused():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise URLError(ConnectionRefusedError())
+        return {"data": {}}
+
+    assert engine("jwt-connect").call(refused) == {"data": {}}
+    assert len(attempts) == 2
+
+    def read_timeout():
+        attempts.append(1)
+        raise socket.timeout("timed out")
+
+    attempts.clear()
+    with pytest.raises(socket.timeout):
+        engine("jwt-read-timeout").call(read_timeout)
+    assert len(attempts) == 1
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    # GraphQL stand-in that rate limits the first request it gets
+    requests = 0
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers["Content-Length"]))
+        type(self).requests += 1
+        if type(self).requests == 1:
+            self.send_response(429)
+            self.send_header("Retry-After", "1")
+            self.end_headers()
+            return
+        body = json.dumps({"data": {"e0": {"entity": {"id": "1"}}}}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stand_in_url():
+    server = HTTPServer(("127.0.0.1", 0), StandInHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}/graphql"
+    server.shutdown()
+    server.server_close()
+
+
+def test_engine_against_stand_in_server(stand_in_url, monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(submit.time, "sleep", sleeps.append)
+
+    def post(document, variables):
+        data = json.dumps({"query": document, "variables": variables}).encode()
+        request = urllib.request.Request(
+            stand_in_url, data, {"Content-Type": "application/json"}
+        )
+        with urllib.request.urlopen(request, timeout=5) as r:
+            return json.load(r)
+
+    class Client:
+        query = staticmethod(post)
+
+    e = engine("jwt-stand-in")
+    results = submit_create_entity_batch(Client(), [Input("a")], engine=e)
+    assert results[0]["data"]["createEntity"] == {"entity": {"id": "1"}}
+    assert StandInHandler.requests == 2
+    assert e.retries == 1
+    assert max(sleeps) >= 1
@@ -0,0 +1,31 @@
+import pytest
+
+pd = pytest.importorskip("pandas")
+pytest.importorskip("godel")
+
+from validate import valid_dates  # noqa: E402
+
+
+def test_valid_dates_only_accepts_listed_shapes():
+    values = pd.Series(
+        [
+            "2020-01-31",
+            "2020-01",
+            "2020",
+            "31-01-2020",
+            "2020-01-31T10:00:00Z",
+            "2020-01-31 10:00",
+            "2020-02-30",
+            "Jan 2020",
+        ]
+    )
+    assert valid_dates(values).tolist() == [
+        True,
+        True,
+        True,
+        True,
+        False,
+        False,
+        False,
+        False,
+    ]